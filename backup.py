@@ -0,0 +1,83 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: backup.py
+#
+
+#
+# Online backups of the projectarium database with rotating retention
+#
+
+import glob
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from config import *
+
+
+def backup_dir(db_path):
+    return BACKUP_DIR or os.path.join(os.path.dirname(os.path.abspath(db_path)), "backups")
+
+def rotate(directory, keep=BACKUP_KEEP):
+    # Names sort by time, so everything before the newest `keep` goes
+    backups = sorted(glob.glob(os.path.join(directory, "projectarium-*.db")))
+    for path in backups[:-keep] if keep > 0 else []:
+        try:
+            os.remove(path)
+        except OSError as e:
+            log.warning("Failed to remove old backup %s: %s", path, e)
+
+
+class Backup:
+    def __init__(self, db_path, interval=BACKUP_INTERVAL_SECONDS):
+        self.db_path = db_path
+        self.directory = backup_dir(db_path)
+        self.interval = interval
+        self.thread = None
+        self.results = queue.SimpleQueue()
+        self.status = ""
+        newest = sorted(glob.glob(os.path.join(self.directory, "projectarium-*.db")))
+        self.last_backup = os.path.getmtime(newest[-1]) if newest else 0.0
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return False
+        self.last_backup = time.time()
+        self.status = "backup: running"
+        self.thread = threading.Thread(target=self.run, name="backup", daemon=True)
+        self.thread.start()
+        return True
+
+    def run(self):
+        # Own connection on this thread: it reads committed pages only, and each step releases the GIL
+        # and the database lock, so the input loop never waits on more than one step
+        path = os.path.join(self.directory, time.strftime("projectarium-%Y%m%d-%H%M%S.db"))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            source = sqlite3.connect(self.db_path)
+            target = sqlite3.connect(path + ".tmp")
+            try:
+                source.backup(target, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP_SECONDS)
+            finally:
+                target.close()
+                source.close()
+            os.replace(path + ".tmp", path)
+            rotate(self.directory)
+            self.results.put(f"backup: {os.path.basename(path)}")
+        except (OSError, sqlite3.Error) as e:
+            log.warning("Backup to %s failed: %s", path, e)
+            self.results.put(f"backup failed: {e}")
+
+    def due(self):
+        return self.interval > 0 and time.time() - self.last_backup >= self.interval
+
+    def reap(self) -> bool:
+        # True when a finished backup changed the status line
+        try:
+            self.status = self.results.get_nowait()
+        except queue.Empty:
+            return False
+        return True
@@ -0,0 +1,121 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: fake_curses.py
+#
+
+#
+# In-memory stand-in for the curses window API, for headless benchmarks
+#
+
+import sys
+from collections import Counter
+
+LINES, COLS = 50, 200
+KEY_RESIZE = 410
+A_BOLD = 1 << 21
+A_REVERSE = 1 << 18
+A_DIM = 1 << 20
+COLORS = 256
+
+stats = Counter()
+
+
+class error(Exception):
+    pass
+
+
+class FakeWindow:
+    def __init__(self, h, w, y, x):
+        self.h, self.w = h or LINES - y, w or COLS - x
+        self.y, self.x = y, x
+        self.attrs = 0
+        self.delay = -1
+
+    def getmaxyx(self):
+        return self.h, self.w
+
+    def getbegyx(self):
+        return self.y, self.x
+
+    def resize(self, h, w):
+        self.h, self.w = h, w
+
+    def mvwin(self, y, x):
+        if y < 0 or x < 0 or y + self.h > LINES or x + self.w > COLS:
+            raise error("mvwin() returned ERR")
+        self.y, self.x = y, x
+
+    def addstr(self, y, x, text, attr=0):
+        # Mirrors curses: writing outside the window is an error, long text wraps
+        if not (0 <= y < self.h and 0 <= x < self.w):
+            raise error("addwstr() returned ERR")
+        stats["cells"] += len(text)
+
+    def addch(self, y, x, ch, attr=0):
+        self.addstr(y, x, ch, attr)
+
+    def attron(self, attr):
+        self.attrs |= attr
+
+    def attroff(self, attr):
+        self.attrs &= ~attr
+
+    def box(self, *args):
+        stats["cells"] += 2 * (self.h + self.w)
+
+    def erase(self):
+        stats["erase"] += 1
+
+    def clear(self):
+        stats["clear"] += 1
+
+    def touchwin(self):
+        pass
+
+    def refresh(self):
+        stats["refresh"] += 1
+
+    def noutrefresh(self):
+        stats["noutrefresh"] += 1
+
+    def keypad(self, flag):
+        pass
+
+    def timeout(self, delay):
+        self.delay = delay
+
+    def nodelay(self, flag):
+        self.delay = 0 if flag else -1
+
+    def getkey(self):
+        raise error("no input")
+
+
+def newwin(h, w, y=0, x=0):
+    stats["newwin"] += 1
+    return FakeWindow(h, w, y, x)
+
+def initscr():
+    return FakeWindow(LINES, COLS, 0, 0)
+
+def doupdate():
+    stats["doupdate"] += 1
+
+def color_pair(n):
+    return n << 8
+
+def _noop(*args, **kwargs):
+    pass
+
+start_color = use_default_colors = init_pair = init_color = curs_set = noecho = echo = set_escdelay = endwin = _noop
+
+
+def update_lines_cols():
+    pass
+
+def install(lines=LINES, cols=COLS):
+    # Must run before anything imports curses
+    global LINES, COLS
+    LINES, COLS = lines, cols
+    sys.modules["curses"] = sys.modules[__name__]
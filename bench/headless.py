@@ -0,0 +1,71 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: headless.py
+#
+
+#
+# Headless board driven through the real StateManager, keymaps and renderer
+#
+
+from collections import deque
+
+from bench import fake_curses
+fake_curses.install()   # before anything below imports curses
+
+import db
+import state
+from keymaps import build_keymaps, handle_key
+from ui.layout import build_windows
+from ui.render import Renderer
+
+
+class ScriptedCommandWindow:
+    def __init__(self, answers=()):
+        self.answers = deque(answers)
+        self.commands = []
+
+    def help(self, commands):
+        self.commands = commands
+
+    def answer(self, default):
+        return self.answers.popleft() if self.answers else default
+
+    def get_input(self, prompt, default="", **kwargs):
+        return self.answer(default)
+
+    def make_selection(self, prompt, choices, default=None, **kwargs):
+        return self.answer(default)
+
+
+class Board:
+    def __init__(self, conn, cw=None, lines=fake_curses.LINES, cols=fake_curses.COLS):
+        fake_curses.install(lines, cols)
+        self.dm = db.DatabaseManager(conn)
+        self.sm = state.StateManager(self.dm, cw or ScriptedCommandWindow())
+        self.sm.windows = build_windows(lines, cols)
+        self.sm.init()
+        self.sm.sync_windows()
+        self.renderer = Renderer(self.sm.windows)
+        self.keymap, self.todo_keymap, self.reorder_keymap = build_keymaps(self.sm)
+        self.draw()
+
+    def draw(self):
+        self.renderer.draw(self.sm)
+
+    def resize(self, lines, cols):
+        fake_curses.install(lines, cols)
+        self.press("KEY_RESIZE")
+
+    def press(self, key):
+        handle_key(self.sm, self.keymap, self.todo_keymap, self.reorder_keymap, key)
+        self.draw()
+
+    def press_batch(self, keys, sizes=None):
+        # Like the main loop with keys queued by key repeat: apply them all, draw once. sizes gives the
+        # screen size to switch to before each KEY_RESIZE
+        for key, size in zip(keys, sizes or [None] * len(keys)):
+            if size:
+                fake_curses.install(*size)
+            handle_key(self.sm, self.keymap, self.todo_keymap, self.reorder_keymap, key)
+        self.draw()
@@ -0,0 +1,118 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: load.py
+# Usage: python -m bench.load [--projects N] [--todos N] [--clients N] [--seconds S] [--min-rps R]
+#
+
+#
+# Load test for projectarium serve, with keep-alive clients against an in-process server
+#
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from bench.synth import build_database
+from server import Server
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+def ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+async def request(reader, writer, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+def next_request(rng, first_id, last_id, n):
+    # Mostly reads, like editor plugins polling, with single writes and batches mixed in
+    pid = rng.randint(first_id, last_id)
+    roll = rng.random()
+    if roll < 0.4:
+        return "GET", f"/projects/{pid}", None
+    if roll < 0.6:
+        return "GET", f"/projects/{pid}/todos", None
+    if roll < 0.75:
+        return "GET", f"/search?q=synthetic+{rng.randint(0, 999)}", None
+    if roll < 0.95:
+        return "POST", f"/projects/{pid}/todos", {"description": f"load todo {n} {rng.random()}"}
+    return "POST", "/batch", {"operations": [{"op": "add_todo", "project_id": rng.randint(first_id, last_id),
+                                              "description": f"load batch {n} {i} {rng.random()}"} for i in range(20)]}
+
+async def client(port, deadline, rng, ids, samples, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    n = 0
+    while time.perf_counter() < deadline:
+        method, path, body = next_request(rng, *ids, n)
+        start = time.perf_counter()
+        status, _ = await request(reader, writer, method, path, body)
+        samples.append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append((method, path, status))
+        n += 1
+    writer.close()
+
+async def run(path, clients, seconds, readers):
+    server = Server(path, readers)
+    listener = await server.start("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    ids = server.writer.cursor.execute("SELECT MIN(id), MAX(id) FROM projects").fetchone()
+    samples, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, start + seconds, random.Random(i), ids, samples, errors) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    listener.close()
+    server.close()
+    return {"requests": len(samples), "rps": round(len(samples) / elapsed, 1), "errors": len(errors),
+            "p50_ms": ms(percentile(samples, 0.50)), "p99_ms": ms(percentile(samples, 0.99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test projectarium serve")
+    parser.add_argument("--projects", type=int, default=1_000)
+    parser.add_argument("--todos", type=int, default=20_000)
+    parser.add_argument("--db", help="copy this database instead of building a synthetic one")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--min-rps", type=float, default=200, help="fail below this many requests per second")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="projectarium-load-")
+    try:
+        path = os.path.join(workdir, "load.db")
+        if args.db:
+            shutil.copyfile(args.db, path)
+        else:
+            build_database(path, args.projects, args.todos)
+        results = asyncio.run(run(path, args.clients, args.seconds, args.readers))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for metric, value in results.items():
+        print(f"{metric:<12} {value}")
+    if results["rps"] < args.min_rps or results["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
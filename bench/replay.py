@@ -0,0 +1,121 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: replay.py
+# Usage: python -m bench.replay TRACE_DIR [TRACE_DIR ...] [--json out.json] [--baseline base.json]
+#
+
+#
+# Replays sessions saved with projectarium --record against a headless board frame by frame: per-frame
+# latency, and the
+# final database state must hash the same as it did at the end of the recording
+#
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from bench.headless import Board, ScriptedCommandWindow
+from bench.run import compare, ms, percentile
+from config import RECORD_SNAPSHOT, RECORD_TRACE
+from launcher import Launcher
+
+
+class DryLauncher(Launcher):
+    # Replays must not open terminals; queued launches are dropped
+    def pump(self, force=False):
+        self.pending.clear()
+
+
+def load_trace(directory):
+    with open(os.path.join(directory, RECORD_TRACE)) as f:
+        header, *events = [json.loads(line) for line in f if line.strip()]
+    end = events.pop()["end"] if events and "end" in events[-1] else None
+    return header, events, end
+
+def frames(events):
+    # Keys between frame markers were applied before a single draw; traces without markers replay a key per frame
+    keys = [event for event in events if "key" in event]
+    if not any("frame" in event for event in events):
+        return [[event] for event in keys]
+    batches, batch = [], []
+    for event in events:
+        if "key" in event:
+            batch.append(event)
+        elif "frame" in event and batch:
+            batches.append(batch)
+            batch = []
+    # The quit key exits before its frame is drawn, so it has no marker
+    return batches + [batch] if batch else batches
+
+def replay(directory, workdir):
+    header, events, end = load_trace(directory)
+    path = os.path.join(workdir, os.path.basename(os.path.normpath(directory)) + ".db")
+    shutil.copyfile(os.path.join(directory, RECORD_SNAPSHOT), path)
+
+    # Prompts are answered in the order they were during the recording
+    answers = [event["input"] for event in events if "input" in event]
+    board = Board(sqlite3.connect(path), ScriptedCommandWindow(answers), header["lines"], header["cols"])
+    board.sm.launcher = DryLauncher()
+    samples, keys = [], 0
+    for batch in frames(events):
+        keys += len(batch)
+        start = time.perf_counter()
+        try:
+            board.press_batch([event["key"] for event in batch], [event.get("size") for event in batch])
+        except SystemExit:
+            # The recorded quit key
+            samples.append(time.perf_counter() - start)
+            break
+        samples.append(time.perf_counter() - start)
+
+    state = board.dm.state_hash()
+    board.dm.conn.close()
+    return {"keys": keys, "frames": len(samples), "total_ms": ms(sum(samples)), "p50_ms": ms(percentile(samples, 0.50)) if samples else 0,
+            "p99_ms": ms(percentile(samples, 0.99)) if samples else 0, "max_ms": ms(max(samples, default=0)),
+            "state": "unchecked" if end is None else "ok" if state == end else "mismatch"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded projectarium sessions")
+    parser.add_argument("traces", nargs="+", help="directories written by projectarium --record")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="fail when a trace is slower than this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="projectarium-replay-")
+    try:
+        for directory in args.traces:
+            name = os.path.basename(os.path.normpath(directory))
+            results.update({f"{name}_{metric}": value for metric, value in replay(directory, workdir).items()})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for metric, value in results.items():
+        print(f"{metric:<32} {value}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if mismatched := [metric for metric, value in results.items() if value == "mismatch"]:
+        print("final state differs from the recording: " + ", ".join(mismatched), file=sys.stderr)
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if regressions := compare({k: v for k, v in results.items() if k.endswith("_ms")}, baseline, args.tolerance):
+            print("regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
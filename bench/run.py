@@ -0,0 +1,152 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: run.py
+# Usage: python -m bench.run [--projects N] [--todos N] [--json out.json] [--baseline base.json]
+#
+
+#
+# Headless benchmark suite for projectarium
+#
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench.headless import Board, ScriptedCommandWindow
+from bench.synth import build_database
+from config import STARTUP_BUDGET_MS
+
+
+# name, keys, scripted command window answers
+SCENARIOS = [
+    ("navigate",     ["KEY_RIGHT"] * 2 + ["KEY_DOWN"] * 500 + ["KEY_UP"] * 500,   []),
+    ("lateral",      ["KEY_RIGHT", "KEY_LEFT"] * 100,                            []),
+    ("priority",     ["+", "-"] * 100,                                           []),
+    ("progress",     ["KEY_RIGHT"] + ["p"] * 100,                                []),
+    ("regress",      ["KEY_RIGHT"] * 2 + ["r"] * 100,                            []),
+    ("todo",         ["t"] + ["KEY_DOWN"] * 20 + ["a", "a", "q"],                ["bench item one", "bench item two"]),
+]
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+def ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def measure_startup(path, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Board(sqlite3.connect(path))
+        samples.append(time.perf_counter() - start)
+    return {"startup_ms": ms(min(samples)), "startup_median_ms": ms(statistics.median(samples))}
+
+def measure_keys(path):
+    results = {}
+    for name, keys, answers in SCENARIOS:
+        board = Board(sqlite3.connect(path), ScriptedCommandWindow(answers))
+        samples = []
+        for key in keys:
+            start = time.perf_counter()
+            board.press(key)
+            samples.append(time.perf_counter() - start)
+        board.dm.conn.commit()
+        results[f"{name}_p50_ms"] = ms(percentile(samples, 0.50))
+        results[f"{name}_p99_ms"] = ms(percentile(samples, 0.99))
+    return results
+
+def measure_burst(path, frames=50, keys_per_frame=20):
+    # Held key-repeat: each frame applies a queued batch of keys and draws once
+    board = Board(sqlite3.connect(path))
+    board.press("KEY_RIGHT")
+    samples = []
+    for i in range(frames):
+        start = time.perf_counter()
+        board.press_batch(["KEY_DOWN" if i % 2 == 0 else "KEY_UP"] * keys_per_frame)
+        samples.append(time.perf_counter() - start)
+    return {"burst_p50_ms": ms(percentile(samples, 0.50)), "burst_p99_ms": ms(percentile(samples, 0.99))}
+
+def measure_memory(path):
+    tracemalloc.start()
+    board = Board(sqlite3.connect(path))
+    for key in SCENARIOS[0][1]:
+        board.press(key)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"python_peak_kb": peak // 1024, "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for metric, value in results.items():
+        if metric in baseline and baseline[metric] > 0 and value > baseline[metric] * (1 + tolerance):
+            regressions.append(f"{metric}: {value} > {baseline[metric]} (+{tolerance:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless projectarium benchmarks")
+    parser.add_argument("--projects", type=int, default=10_000)
+    parser.add_argument("--todos", type=int, default=1_000_000)
+    parser.add_argument("--db", help="reuse (or create) this synthetic database instead of a temporary one")
+    parser.add_argument("--repeat", type=int, default=5, help="startup runs, the fastest is reported")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="fail when a metric is slower than this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="fail when cold start to first frame is slower than this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="projectarium-bench-")
+    try:
+        base = args.db or os.path.join(workdir, "base.db")
+        if not os.path.exists(base):
+            start = time.perf_counter()
+            build_database(base, args.projects, args.todos)
+            print(f"built {args.projects} projects / {args.todos} todos in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+        # Mutating scenarios run on a scratch copy so every run starts from the same data
+        path = os.path.join(workdir, "work.db")
+        shutil.copyfile(base, path)
+
+        results = {"projects": args.projects, "todos": args.todos}
+        results.update(measure_startup(path, args.repeat))
+        results.update(measure_keys(path))
+        results.update(measure_burst(path))
+        results.update(measure_memory(path))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for metric, value in results.items():
+        print(f"{metric:<24} {value}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if results["startup_ms"] > args.startup_budget_ms:
+        print(f"startup {results['startup_ms']}ms is over the {args.startup_budget_ms}ms budget", file=sys.stderr)
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if regressions := compare({k: v for k, v in results.items() if k.endswith(("_ms", "_kb"))}, baseline, args.tolerance):
+            print("regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: smoke.py
+# Usage: python -m bench.smoke
+#
+
+#
+# Headless regression checks for projectarium; exits 1 when any check fails
+#
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import traceback
+
+from bench.headless import Board, ScriptedCommandWindow   # installs the fake curses before db is imported
+from bench.synth import build_database
+import db
+
+
+def plan(conn, query, params):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+
+def check_small_screen(path):
+    # 60 columns leaves no room for cards, so todos must refuse to open instead of crashing
+    board = Board(sqlite3.connect(path), lines=24, cols=60)
+    assert not board.sm.fits()
+    for key in ["KEY_RIGHT", "t", "a", "KEY_DOWN", "/", "\x1b", "S", "x", "t"]:
+        board.press(key)
+    assert not board.sm.in_todo and board.sm.notice
+
+    # Shrinking with the todo list open closes it; growing back lets it open again
+    board = Board(sqlite3.connect(path))
+    board.press("t")
+    assert board.sm.in_todo
+    board.resize(24, 60)
+    assert not board.sm.in_todo and board.sm.notice
+    board.resize(40, 160)
+    board.press("t")
+    assert board.sm.in_todo and not board.sm.notice
+    board.press("q")
+
+def check_changed_projects_plan(path):
+    # sync_external polls this on every idle tick; it must range-scan the rev index, not the table
+    conn = sqlite3.connect(path)
+    steps = plan(conn, db.PULL_CHANGED_PROJECTS, (0,))
+    assert any("USING INDEX idx_projects_rev (rev>?)" in step for step in steps), steps
+    assert not any(step.startswith("SCAN p") for step in steps), steps
+
+    dm = db.DatabaseManager(conn)
+    rev = dm.current_rev()
+    project = dm.pull_projects()[0]
+    dm.add_item("smoke changed todo", project.id)
+    _, changed, _ = dm.pull_changes(rev)
+    assert [(p.id, p.todo_count) for p in changed] == [(project.id, project.todo_count + 1)], changed
+
+def check_unknown_status(path):
+    # Statuses with no column, written by other tools, are left off the board at startup and on sync
+    copy = path + ".status"
+    shutil.copyfile(path, copy)
+    other = sqlite3.connect(copy)
+    paused, moved = [row[0] for row in other.execute("SELECT id FROM projects ORDER BY id LIMIT 2")]
+    other.execute("UPDATE projects SET status = 'Paused' WHERE id = ?", (paused,))
+    other.commit()
+    board = Board(sqlite3.connect(copy))
+    board.draw()
+
+    other.execute("UPDATE projects SET status = 'Paused' WHERE id IN (?, ?)", (paused, moved))
+    other.commit()
+    board.sm.sync_external()
+    board.draw()
+    shown = {project.id for window in board.sm.windows for project in window.projects}
+    assert paused not in shown and moved not in shown, (paused, moved)
+
+    other.execute("UPDATE projects SET status = ? WHERE id = ?", (db.STATUS_NAMES[0], moved))
+    other.commit()
+    board.sm.sync_external()
+    board.draw()
+    assert moved in {project.id for project in board.sm.windows[0].projects}
+    board.press("/")
+    board.press("\x1b")
+
+def check_batched_todo(path):
+    # Keys coalesced into one frame run before the next draw; + reorders the column, so t must still
+    # anchor to and fetch the active project, and a must add the todo there
+    board = Board(sqlite3.connect(path), ScriptedCommandWindow(["smoke batched todo"]))
+    board.press("KEY_DOWN")
+    board.press_batch(["+", "t", "a"])
+    tm, project = board.sm.tm, board.sm.get_active_card()
+    assert tm.project_id == project.id and tm.card.project is project, (tm.project_id, project.id)
+    owner = board.dm.cursor.execute("SELECT project_id FROM todo WHERE description = ?", ("smoke batched todo",)).fetchone()
+    assert owner == (project.id,), (owner, project.id)
+    assert "smoke batched todo" in [tm.get_item(i).description for i in range(tm.count)]
+    board.press("q")
+
+CHECKS = [check_small_screen, check_changed_projects_plan, check_unknown_status, check_batched_todo]
+
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory(prefix="projectarium-smoke-") as workdir:
+        path = os.path.join(workdir, "smoke.db")
+        build_database(path, 200, 2_000)
+        for check in CHECKS:
+            try:
+                check(path)
+                print(f"ok      {check.__name__}")
+            except (Exception, SystemExit):
+                failed += 1
+                print(f"FAILED  {check.__name__}\n{traceback.format_exc()}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
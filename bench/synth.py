@@ -0,0 +1,37 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: synth.py
+#
+
+#
+# Synthetic projectarium databases for benchmarks
+#
+
+import random
+import sqlite3
+
+from config import *
+from db import DatabaseManager, NOW
+
+CHUNK = 100_000
+
+
+def build_database(path, projects=10_000, todos=1_000_000, deleted_every=10, seed=0):
+    rng = random.Random(seed)
+    dm = DatabaseManager(sqlite3.connect(path))
+    statuses = list(STATUSES)
+
+    for start in range(0, projects, CHUNK):
+        dm.add_projects((f"project-{i:06d}", f"synthetic project {i}", f"/tmp/synthetic/{i}", "main.py", statuses[rng.randrange(len(statuses))], "Python")
+                        for i in range(start, min(start + CHUNK, projects)))
+
+    first_id, last_id = dm.cursor.execute("SELECT MIN(id), MAX(id) FROM projects").fetchone()
+    for start in range(0, todos, CHUNK):
+        dm.add_items((f"synthetic todo {i}", rng.randint(first_id, last_id))
+                     for i in range(start, min(start + CHUNK, todos)))
+
+    # Leave a share of soft-deleted rows behind, like a long-lived board
+    dm.cursor.execute(f"UPDATE todo SET deleted = 1, deleted_at = {NOW} WHERE id % ? = 0", (deleted_every,))
+    dm.conn.commit()
+    dm.conn.close()
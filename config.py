@@ -9,6 +9,7 @@
 #
 
 import logging
+import os
 log = logging.getLogger(__name__)
 log.info("Starting projectarium configuration")
 
@@ -21,20 +22,52 @@ BACKLOG = 1
 ACTIVE = 2
 DONE = 3
 HELP = 4
-STATUSES = {
-    "Abandoned":    (0, RED),
-    "Backlog":      (1, BLUE),
-    "Active":       (2, BRIGHT_YELLOW),
-    "Done":         (3, GREEN),
-}
+# Board columns, left to right; the layout sizes itself to however many are listed
+COLUMNS = [
+    ("Abandoned",   RED),
+    ("Backlog",     BLUE),
+    ("Active",      BRIGHT_YELLOW),
+    ("Done",        GREEN),
+]
+STATUSES = {name: (i, color) for i, (name, color) in enumerate(COLUMNS)}
+STATUS_NAMES = list(STATUSES)
+NEW_PROJECT_STATUS = "Backlog"
+# Cycle time runs from first entering STARTED_STATUS to entering FINISHED_STATUS
+STARTED_STATUS = "Active"
+FINISHED_STATUS = "Done"
 
 
 # Assign other variables
 PROD_DB_PATH = "/home/sean/.local/share/projectarium/.projectarium.db"
 DB_PATH = ".projectarium.db"
-TERMINAL_PREFIX = "gnome-terminal --maximize --working-directory="
-NEOVIM_PREFIX = "nvim "
-TMUX_PREFIX = "tmux new-session -A -s "
+TERMINAL_COMMAND = ["gnome-terminal", "--maximize", "--working-directory={path}"]
+NEOVIM_COMMAND = ["nvim", "{file}"]
+TMUX_COMMAND = ["tmux", "new-session", "-A", "-s", "{session}", "-c", "{path}"]
+LAUNCHER_MAX_RUNNING = 4
+IDLE_TIMEOUT_MS = 250
+# Keys queued between frames are applied together and drawn once, at most FRAME_RATE times a second
+FRAME_RATE = 60
+INPUT_BATCH_SECONDS = 0.1
+
+# Write-behind batching, also enabled with --write-behind
+WRITE_BEHIND = os.environ.get("PROJECTARIUM_WRITE_BEHIND", "") == "1"
+WRITE_BEHIND_MAX_PENDING = 50
+WRITE_BEHIND_IDLE_SECONDS = 1.0
+WRITE_BEHIND_MAX_AGE_SECONDS = 2.0   # steady typing never goes idle; bounds how long the write lock is held
+
+# Logging goes to an in-memory ring buffer, dumped on crash or with 'L'; also set with --log-level
+LOG_LEVEL = os.environ.get("PROJECTARIUM_LOG", "WARNING")
+LOG_RING_CAPACITY = 2000
+LOG_DUMP_PATH = "debug.log"
+
+# --profile: per-frame phase timings, summarized over the last PROFILE_WINDOW key presses
+PROFILE_TRACE_PATH = "profile.jsonl"
+PROFILE_WINDOW = 500
+PROFILE_OVERLAY_SECONDS = 1.0
+
+# --record DIR: start-of-session database copy and the timestamped key/prompt trace, replayed by bench.replay
+RECORD_SNAPSHOT = "start.db"
+RECORD_TRACE = "keys.jsonl"
 
 
 # UI dimensions
@@ -44,6 +77,7 @@ COMMAND_WINDOW_HEIGHT   = 3
 COMMAND_WINDOW          = None
 INACTIVE_CARD_HEIGHT    = 3
 ACTIVE_CARD_HEIGHT      = 6
+MIN_CARD_WIDTH          = 12
 
 NO_TODO_ITEMS       = 0
 LOW_TODO_ITEMS      = 3
@@ -54,12 +88,54 @@ DARK                = 1
 TODO_COLORS = [(NO_TODO_ITEMS, REGULAR, DIM_WHITE), (LOW_TODO_ITEMS, REGULAR, GREEN), (MEDIUM_TODO_ITEMS, REGULAR, BRIGHT_YELLOW), (MAX_TODO_ITEMS, REGULAR, RED),
                (NO_TODO_ITEMS, DARK, GUTTER), (LOW_TODO_ITEMS, DARK, LIGHT_GREEN), (MEDIUM_TODO_ITEMS, DARK, YELLOW), (MAX_TODO_ITEMS, DARK, LIGHT_RED)
                ]
-color_code = lambda tc, s: [color for limit, shade, color in TODO_COLORS if tc <= limit and s == shade][0]
+color_code = lambda tc, s: [color for limit, shade, color in TODO_COLORS if min(tc, MAX_TODO_ITEMS) <= limit and s == shade][0]
 
 
 COMMAND_STATES      =  [ADD := 0,   DELETE := 1,  EDIT := 2, SELECT := 3]
 EDIT_PROJECT_CHOICES   =  ["name", "description", "path", "file", "language"]
 
+# Cold start to first frame on the 10k project / 1M todo bench database
+STARTUP_BUDGET_MS = 500
+
+# Gap between stored card ranks, so reordering can insert between two cards without renumbering
+RANK_STEP = 1024.0
+
+TODO_MAX_ROWS = 30
+TODO_PAGE_SIZE = 200
+
+# Background project scanner, disabled with --no-scan
+SCAN_WORKERS = 4
+SCAN_INTERVAL_SECONDS = 300
+SCAN_GIT_TIMEOUT_SECONDS = 5
+SCAN_MAX_FILES = 20000
+SCAN_SKIP_DIRS = {"node_modules", "__pycache__", "target", "build", "venv"}
+
+IMPORT_BATCH_SIZE = 5000
+
+# Deleted todos older than this move to todo_archive on idle, ARCHIVE_BATCH_SIZE rows per tick
+ARCHIVE_AGE_SECONDS = 30 * 86400
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_VACUUM_PAGES = 256
+ARCHIVE_INTERVAL_SECONDS = 600
+
+# Online backups ('w' or every BACKUP_INTERVAL_SECONDS, 0 disables the timer); BACKUP_DIR defaults to backups/ next to the database
+BACKUP_DIR = os.environ.get("PROJECTARIUM_BACKUP_DIR", "")
+BACKUP_INTERVAL_SECONDS = 6 * 3600
+BACKUP_KEEP = 7
+BACKUP_PAGES = 64
+BACKUP_SLEEP_SECONDS = 0.005
+
+STATS_WEEKS = 8
+
+# projectarium serve
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8765
+SERVE_READERS = 4
+SERVE_MAX_BODY = 4 * 1024 * 1024
+
+SEARCH_LIMIT = 12
+SEARCH_WIDTH = 70
+
 WINDOWS = []
 
 MODES = [BLAND := 0, COLORED := 1, DIM := 2]
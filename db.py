@@ -9,19 +9,341 @@
 #
 
 from config import *
-from objects import Project, TodoItem
+from objects import Project, ScanInfo, TodoItem
 
+import hashlib
 import sqlite3
+import time
+from contextlib import contextmanager
+from itertools import islice
 
 
+# Row factories, so queries hand back model objects instead of positional tuples
+def project_row(cursor, row):
+    pid, name, description, path, file, priority, status, language, rank, todo_count = row
+    return Project(pid, name, description or "", path, file or "", priority, status, language or "", todo_count, rank=rank)
+
+def todo_row(cursor, row):
+    tid, description, priority, deleted, project_id = row
+    return TodoItem(tid, description, priority, bool(deleted), project_id)
+
+
+PROJECT_COLUMNS = "p.id, p.name, p.description, p.path, p.file, p.priority, p.status, p.language, p.rank"
+TODO_COLUMNS = "id, description, priority, deleted, project_id"
+
+# Live todo counts come from one grouped join instead of a COUNT(*) per project.
+# todo.project_id is untyped, so the unary + drops p.id's affinity and lets the join use the partial idx_todo_live.
+# deleted is an index column as well, so the t.deleted = 0 check is answered from the index without touching todo rows
+PULL_PROJECTS = f'''
+    SELECT {PROJECT_COLUMNS}, COUNT(t.id)
+    FROM projects p
+    LEFT JOIN todo t ON t.project_id = +p.id AND t.deleted = 0
+    GROUP BY p.id
+    ORDER BY p.priority DESC, p.rank;
+'''
+PULL_PROJECTS_BY_STATUS = f'''
+    SELECT {PROJECT_COLUMNS}, COUNT(t.id)
+    FROM projects p
+    LEFT JOIN todo t ON t.project_id = +p.id AND t.deleted = 0
+    WHERE p.status = ?
+    GROUP BY p.id
+    ORDER BY p.priority DESC, p.rank;
+'''
+# Polled on every idle tick: a grouped join would walk projects in id order, so the count is a correlated
+# subquery and p.rev > ? can range-scan idx_projects_rev over just the changed rows
+PULL_CHANGED_PROJECTS = f'''
+    SELECT {PROJECT_COLUMNS}, (SELECT COUNT(*) FROM todo t WHERE t.project_id = +p.id AND t.deleted = 0)
+    FROM projects p
+    WHERE p.rev > ?;
+'''
+PULL_PROJECT = f'''
+    SELECT {PROJECT_COLUMNS}, COUNT(t.id)
+    FROM projects p
+    LEFT JOIN todo t ON t.project_id = +p.id AND t.deleted = 0
+    WHERE p.id = ?
+    GROUP BY p.id;
+'''
+
+# Within a priority, cards are ordered by a stored rank instead of by name. Ranks leave RANK_STEP gaps so
+# a move only rewrites the moved row; new projects go to the bottom of their priority
+RANK_SCHEMA = [
+    "ALTER TABLE projects ADD COLUMN rank REAL;",
+    f'''
+    UPDATE projects SET rank = ordered.n * {RANK_STEP}
+    FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY priority DESC, LOWER(name), id) AS n FROM projects) AS ordered
+    WHERE projects.id = ordered.id;
+    ''',
+    "DROP INDEX IF EXISTS idx_projects_status_order;",
+    "CREATE INDEX IF NOT EXISTS idx_projects_status_order ON projects (status, priority DESC, rank);",
+    "CREATE INDEX IF NOT EXISTS idx_projects_rank ON projects (rank);",
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rank_projects_insert AFTER INSERT ON projects WHEN NEW.rank IS NULL BEGIN
+        UPDATE projects SET rank = (SELECT IFNULL(MAX(rank), 0) + {RANK_STEP} FROM projects) WHERE id = NEW.id;
+    END;
+    ''',
+]
+
+# Every write to projects, and every todo write, stamps the affected projects with the next global
+# rev, so another instance can fetch only what changed since the rev it last saw
+CHANGE_TRACKING_SCHEMA = [
+    "ALTER TABLE projects ADD COLUMN rev INTEGER NOT NULL DEFAULT 0;",
+    "CREATE INDEX IF NOT EXISTS idx_projects_rev ON projects (rev);",
+    "CREATE TABLE IF NOT EXISTS sync_state (id INTEGER PRIMARY KEY CHECK (id = 0), rev INTEGER NOT NULL);",
+    "INSERT OR IGNORE INTO sync_state VALUES (0, 0);",
+    "CREATE TABLE IF NOT EXISTS project_tombstones (project_id INTEGER PRIMARY KEY, rev INTEGER NOT NULL);",
+    '''
+    CREATE TRIGGER IF NOT EXISTS rev_projects_insert AFTER INSERT ON projects BEGIN
+        UPDATE sync_state SET rev = rev + 1;
+        UPDATE projects SET rev = (SELECT rev FROM sync_state) WHERE id = NEW.id;
+        DELETE FROM project_tombstones WHERE project_id = NEW.id;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS rev_projects_update AFTER UPDATE ON projects WHEN NEW.rev = OLD.rev BEGIN
+        UPDATE sync_state SET rev = rev + 1;
+        UPDATE projects SET rev = (SELECT rev FROM sync_state) WHERE id = NEW.id;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS rev_projects_delete AFTER DELETE ON projects BEGIN
+        UPDATE sync_state SET rev = rev + 1;
+        INSERT OR REPLACE INTO project_tombstones VALUES (OLD.id, (SELECT rev FROM sync_state));
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS rev_todo_insert AFTER INSERT ON todo BEGIN
+        UPDATE sync_state SET rev = rev + 1;
+        UPDATE projects SET rev = (SELECT rev FROM sync_state) WHERE id = NEW.project_id;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS rev_todo_update AFTER UPDATE OF deleted, project_id ON todo BEGIN
+        UPDATE sync_state SET rev = rev + 1;
+        UPDATE projects SET rev = (SELECT rev FROM sync_state) WHERE id IN (OLD.project_id, NEW.project_id);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS rev_todo_delete AFTER DELETE ON todo WHEN OLD.deleted = 0 BEGIN
+        UPDATE sync_state SET rev = rev + 1;
+        UPDATE projects SET rev = (SELECT rev FROM sync_state) WHERE id = OLD.project_id;
+    END;
+    ''',
+]
+
+SEARCH_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(body, project_id UNINDEXED, prefix='1 2 3');",
+    '''
+    CREATE TRIGGER IF NOT EXISTS search_projects_insert AFTER INSERT ON projects BEGIN
+        INSERT INTO search (rowid, body, project_id)
+        VALUES (NEW.id * 2, NEW.name || ' ' || IFNULL(NEW.description, '') || ' ' || IFNULL(NEW.language, ''), NEW.id);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS search_projects_update AFTER UPDATE OF name, description, language ON projects BEGIN
+        DELETE FROM search WHERE rowid = OLD.id * 2;
+        INSERT INTO search (rowid, body, project_id)
+        VALUES (NEW.id * 2, NEW.name || ' ' || IFNULL(NEW.description, '') || ' ' || IFNULL(NEW.language, ''), NEW.id);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS search_projects_delete AFTER DELETE ON projects BEGIN
+        DELETE FROM search WHERE rowid = OLD.id * 2;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS search_todo_insert AFTER INSERT ON todo WHEN NEW.deleted = 0 BEGIN
+        INSERT INTO search (rowid, body, project_id) VALUES (NEW.id * 2 + 1, NEW.description, NEW.project_id);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS search_todo_update AFTER UPDATE OF description, deleted, project_id ON todo BEGIN
+        DELETE FROM search WHERE rowid = OLD.id * 2 + 1;
+        INSERT INTO search (rowid, body, project_id) SELECT NEW.id * 2 + 1, NEW.description, NEW.project_id WHERE NEW.deleted = 0;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS search_todo_delete AFTER DELETE ON todo BEGIN
+        DELETE FROM search WHERE rowid = OLD.id * 2 + 1;
+    END;
+    ''',
+]
+# Unix time inside SQL, matching time.time()
+NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+# Every status change lands in status_history. Triggers also keep small aggregate tables current,
+# so flow metrics never scan the history:
+#   status_dwell       completed stays per status (exits, total seconds)
+#   status_occupancy   projects currently in each status and the sum of when they entered it
+#   weekly_flow        finished projects per week and their summed cycle time
+HISTORY_SCHEMA = [
+    "ALTER TABLE projects ADD COLUMN status_since REAL;",
+    "ALTER TABLE projects ADD COLUMN started_at REAL;",
+    f"UPDATE projects SET status_since = {NOW}, started_at = CASE WHEN status = '{STARTED_STATUS}' THEN {NOW} END;",
+    '''
+    CREATE TABLE IF NOT EXISTS status_history (
+        id INTEGER PRIMARY KEY,
+        project_id INTEGER NOT NULL,
+        from_status TEXT,
+        to_status TEXT NOT NULL,
+        changed_at REAL NOT NULL
+    );
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_status_history_project ON status_history (project_id, changed_at);",
+    "CREATE INDEX IF NOT EXISTS idx_status_history_changed ON status_history (changed_at);",
+    "CREATE TABLE IF NOT EXISTS status_dwell (status TEXT PRIMARY KEY, exits INTEGER NOT NULL, total_seconds REAL NOT NULL);",
+    "CREATE TABLE IF NOT EXISTS status_occupancy (status TEXT PRIMARY KEY, projects INTEGER NOT NULL, since_total REAL NOT NULL);",
+    "CREATE TABLE IF NOT EXISTS weekly_flow (week TEXT PRIMARY KEY, finished INTEGER NOT NULL, cycle_count INTEGER NOT NULL, cycle_seconds REAL NOT NULL);",
+    "INSERT INTO status_occupancy SELECT status, COUNT(*), SUM(status_since) FROM projects GROUP BY status;",
+    f'''
+    CREATE TRIGGER IF NOT EXISTS history_projects_insert AFTER INSERT ON projects BEGIN
+        INSERT INTO status_history (project_id, from_status, to_status, changed_at) VALUES (NEW.id, NULL, NEW.status, {NOW});
+        INSERT INTO status_occupancy VALUES (NEW.status, 1, {NOW})
+            ON CONFLICT (status) DO UPDATE SET projects = projects + 1, since_total = since_total + excluded.since_total;
+        UPDATE projects SET status_since = {NOW}, started_at = CASE WHEN NEW.status = '{STARTED_STATUS}' THEN {NOW} END WHERE id = NEW.id;
+    END;
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS history_projects_status AFTER UPDATE OF status ON projects WHEN NEW.status IS NOT OLD.status BEGIN
+        INSERT INTO status_history (project_id, from_status, to_status, changed_at) VALUES (NEW.id, OLD.status, NEW.status, {NOW});
+        INSERT INTO status_dwell VALUES (OLD.status, 1, {NOW} - OLD.status_since)
+            ON CONFLICT (status) DO UPDATE SET exits = exits + 1, total_seconds = total_seconds + excluded.total_seconds;
+        UPDATE status_occupancy SET projects = projects - 1, since_total = since_total - OLD.status_since WHERE status = OLD.status;
+        INSERT INTO status_occupancy VALUES (NEW.status, 1, {NOW})
+            ON CONFLICT (status) DO UPDATE SET projects = projects + 1, since_total = since_total + excluded.since_total;
+        INSERT INTO weekly_flow SELECT strftime('%Y-%W', 'now'), 1, OLD.started_at IS NOT NULL, IFNULL({NOW} - OLD.started_at, 0)
+            WHERE NEW.status = '{FINISHED_STATUS}'
+            ON CONFLICT (week) DO UPDATE SET finished = finished + 1, cycle_count = cycle_count + excluded.cycle_count,
+                cycle_seconds = cycle_seconds + excluded.cycle_seconds;
+        -- A finished project that is reopened starts a new cycle
+        UPDATE projects SET status_since = {NOW}, started_at = CASE
+            WHEN NEW.status = '{FINISHED_STATUS}' THEN NULL
+            WHEN NEW.status = '{STARTED_STATUS}' THEN IFNULL(OLD.started_at, {NOW})
+            ELSE OLD.started_at END
+        WHERE id = NEW.id;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS history_projects_delete AFTER DELETE ON projects BEGIN
+        UPDATE status_occupancy SET projects = projects - 1, since_total = since_total - OLD.status_since WHERE status = OLD.status;
+    END;
+    ''',
+]
+# What a replayed session must reproduce: user-visible rows without timestamps. Archived todos count as deleted
+# rows, so idle archiving during a recording does not change the result
+STATE_QUERIES = [
+    f"SELECT {PROJECT_COLUMNS} FROM projects p ORDER BY p.id",
+    f"SELECT {TODO_COLUMNS} FROM todo UNION ALL SELECT id, description, priority, 1, project_id FROM todo_archive ORDER BY id",
+    "SELECT project_id, from_status, to_status FROM status_history ORDER BY id",
+]
+
+LIVE_TODO_INDEX = "CREATE INDEX IF NOT EXISTS idx_todo_live ON todo (project_id, deleted, id) WHERE deleted = 0;"
+
+# todo is rebuilt so description is only unique among live rows. Deleted rows carry deleted_at and are moved to
+# todo_archive in batches once older than ARCHIVE_AGE_SECONDS; live reads go through partial indexes
+ARCHIVE_SCHEMA = [
+    '''
+    CREATE TABLE todo_rebuilt (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        description TEXT NOT NULL,
+        priority TEXT,
+        deleted BOOLEAN NOT NULL DEFAULT 0,
+        project_id,
+        deleted_at REAL,
+        FOREIGN KEY (project_id) REFERENCES projects (id)
+    );
+    ''',
+    f'''
+    INSERT INTO todo_rebuilt (id, description, priority, deleted, project_id, deleted_at)
+        SELECT id, description, priority, deleted, project_id, CASE WHEN deleted THEN {NOW} END FROM todo;
+    ''',
+    "DROP TABLE todo;",
+    "ALTER TABLE todo_rebuilt RENAME TO todo;",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_todo_live_description ON todo (description) WHERE deleted = 0;",
+    LIVE_TODO_INDEX,
+    "CREATE INDEX IF NOT EXISTS idx_todo_dead ON todo (deleted_at) WHERE deleted = 1;",
+    '''
+    CREATE TABLE IF NOT EXISTS todo_archive (
+        id INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        priority TEXT,
+        project_id,
+        deleted_at REAL,
+        archived_at REAL NOT NULL
+    );
+    ''',
+]
 
 class DatabaseManager:
-    def __init__(self, conn,):
+    def __init__(self, conn, write_behind=False):
         self.conn = conn
         self.cursor = conn.cursor()
+        self.write_behind = write_behind
+        self.pending = 0
+        self.last_write = 0.0
+        self.first_write = 0.0
+        self.batching = False
         self.init()
+        if write_behind:
+            self.enable_write_behind()
+
+    def enable_write_behind(self):
+        # WAL keeps readers unblocked while a batch is open, and NORMAL only syncs at checkpoints
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
+
+    def commit(self):
+        # In write-behind mode mutations accumulate in the open transaction until a flush
+        if self.batching:
+            return
+        if not self.write_behind:
+            self.conn.commit()
+            return
+        self.last_write = time.monotonic()
+        if not self.pending:
+            self.first_write = self.last_write
+        self.pending += 1
+        if self.pending >= WRITE_BEHIND_MAX_PENDING or self.last_write - self.first_write >= WRITE_BEHIND_MAX_AGE_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if self.conn.in_transaction:
+            self.conn.commit()
+            log.debug("Flushed %d queued mutations", self.pending)
+        self.pending = 0
+
+    @contextmanager
+    def batch(self):
+        # Mutators inside the block share one transaction, committed at the end or rolled back on error
+        self.flush()
+        self.batching = True
+        try:
+            yield self
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            self.batching = False
+
+    def flush_if_idle(self):
+        now = time.monotonic()
+        if self.pending and (now - self.last_write >= WRITE_BEHIND_IDLE_SECONDS or now - self.first_write >= WRITE_BEHIND_MAX_AGE_SECONDS):
+            self.flush()
 
     def init(self):
+        # Schema work only runs when the stored version is behind MIGRATIONS
+        version = self.cursor.execute("PRAGMA user_version;").fetchone()[0]
+        if version == 0:
+            # Only takes effect on a new file; older databases switch with 'projectarium compact'
+            self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        for version, migration in enumerate(self.MIGRATIONS[version:], start=version + 1):
+            log.info("Migrating database to version %d (%s)", version, migration.__name__)
+            self.cursor.execute("BEGIN;")
+            migration(self)
+            self.cursor.execute(f"PRAGMA user_version = {version};")
+            self.conn.commit()
+
+    def create_tables(self):
         # Create the 'projects' table
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS projects (
@@ -47,12 +369,64 @@ class DatabaseManager:
             );
         ''')
 
-        # self.cursor.execute("ALTER TABLE projects ADD COLUMN priority INTEGER DEFAULT 0;")
+    def create_indexes(self):
+        # Covers the live todo count join in pull_projects
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_todo_project_deleted ON todo (project_id, deleted);")
+        # Matches the board ordering so per-status loads walk the index in order
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_status_order ON projects (status, priority DESC, LOWER(name));")
 
-        self.conn.commit()
+    def create_search_index(self):
+        # One FTS5 table for both sources: projects use rowid id*2 and live todos id*2+1,
+        # so the sync triggers update by rowid instead of scanning
+        exists = self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'search'").fetchone()
+        for statement in SEARCH_SCHEMA:
+            self.cursor.execute(statement)
+        if not exists:
+            self.cursor.execute("INSERT INTO search (rowid, body, project_id) SELECT id * 2, name || ' ' || IFNULL(description, '') || ' ' || IFNULL(language, ''), id FROM projects")
+            self.cursor.execute("INSERT INTO search (rowid, body, project_id) SELECT id * 2 + 1, description, project_id FROM todo WHERE deleted = 0")
 
-        if DB_PATH == ".projectarium.db":
-            self.init_populate()
+    def create_scan_cache(self):
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_cache (
+                project_id INTEGER PRIMARY KEY,
+                mtime TEXT NOT NULL,
+                head TEXT NOT NULL,
+                branch TEXT,
+                dirty BOOLEAN NOT NULL DEFAULT 0,
+                last_modified REAL,
+                file_count INTEGER
+            );
+        ''')
+
+    def create_change_tracking(self):
+        for statement in CHANGE_TRACKING_SCHEMA:
+            self.cursor.execute(statement)
+
+    # Append only: a database at user_version N has run the first N steps
+    def create_ranks(self):
+        for statement in RANK_SCHEMA:
+            self.cursor.execute(statement)
+
+    def create_history(self):
+        for statement in HISTORY_SCHEMA:
+            self.cursor.execute(statement)
+
+    def create_archive(self):
+        for statement in ARCHIVE_SCHEMA:
+            self.cursor.execute(statement)
+        # Dropping the old table dropped its triggers and indexes
+        for statement in CHANGE_TRACKING_SCHEMA + SEARCH_SCHEMA:
+            if "TRIGGER" in statement and " ON todo " in statement:
+                self.cursor.execute(statement)
+        self.cursor.execute("DROP INDEX IF EXISTS idx_todo_project_deleted;")
+
+    def create_live_index(self):
+        # Version 8 indexed (project_id, id) only, so the todo-count join re-read every live row to check deleted
+        self.cursor.execute("DROP INDEX IF EXISTS idx_todo_live;")
+        self.cursor.execute(LIVE_TODO_INDEX)
+
+    MIGRATIONS = [create_tables, create_indexes, create_search_index, create_scan_cache, create_change_tracking, create_ranks, create_history,
+                  create_archive, create_live_index]
 
     def init_populate(self):
         if DB_PATH == ".projectarium.db":
@@ -98,28 +472,49 @@ class DatabaseManager:
 
     def pull_projects(self, status_filter=""):
         if status_filter:
-            status_filter = f"WHERE status = '{status_filter}'"
-        entries = self.cursor.execute(f"SELECT * FROM projects {status_filter} ORDER BY priority DESC, LOWER(name);", ()).fetchall()
-        projects = []
-        for entry in entries:
-            pid, name, description, path, file, priority, status, language = entry
-            
-            todo_count = self.cursor.execute("SELECT COUNT(*) FROM todo WHERE project_id = ? AND deleted = ?", (pid, 0)).fetchone()[0]
-
-            projects.append(Project(
-                id=pid,
-                name=name,
-                description=description or "",
-                path=path,
-                file=file or "",
-                priority=priority,
-                status=status,
-                language=language or "",
-                todo_count=todo_count
-            ))
-            # log.debug(f"Pulled project: {name} with status: {status} and todo count: {todo_count}")
-
-        return projects
+            return self.rows(project_row, PULL_PROJECTS_BY_STATUS, (status_filter,)).fetchall()
+        return self.rows(project_row, PULL_PROJECTS).fetchall()
+
+    def rows(self, factory, query, parameters=()):
+        # A fresh cursor, so the row factory never leaks into self.cursor
+        cursor = self.conn.cursor()
+        cursor.row_factory = factory
+        return cursor.execute(query, parameters)
+
+    def path(self):
+        # File behind the main schema, "" for in-memory databases
+        return self.cursor.execute("PRAGMA database_list;").fetchone()[2]
+
+    def data_version(self):
+        # Changes whenever another connection commits to this database
+        return self.cursor.execute("PRAGMA data_version;").fetchone()[0]
+
+    def snapshot(self, path):
+        # Consistent copy of the database, pending write-behind work included
+        self.flush()
+        target = sqlite3.connect(path)
+        try:
+            self.conn.backup(target)
+        finally:
+            target.close()
+
+    def state_hash(self):
+        self.flush()
+        digest = hashlib.sha256()
+        for query in STATE_QUERIES:
+            for row in self.cursor.execute(query):
+                digest.update(repr(row).encode())
+        return digest.hexdigest()
+
+    def current_rev(self):
+        return self.cursor.execute("SELECT rev FROM sync_state").fetchone()[0]
+
+    def pull_changes(self, since_rev):
+        # Projects written or whose todos changed after since_rev, plus ids deleted since then
+        rev = self.current_rev()
+        changed = self.rows(project_row, PULL_CHANGED_PROJECTS, (since_rev,)).fetchall()
+        deleted = [pid for (pid,) in self.cursor.execute("SELECT project_id FROM project_tombstones WHERE rev > ?", (since_rev,)).fetchall()]
+        return rev, changed, deleted
 
     def pull_card_data(self, title):
         # log.info(f"Pulling card data for status: {title}")
@@ -128,54 +523,221 @@ class DatabaseManager:
         # return [tuple(list(row) + [self.cursor.execute("SELECT COUNT(*) FROM todo WHERE project_id = ? AND deleted = ?;", (row[0], 0,)).fetchone()[0]])
             # for 
 
+    def search(self, query, limit=SEARCH_LIMIT):
+        # Every typed word is a prefix term, quoted so FTS5 syntax in the input is taken literally
+        terms = " ".join('"' + word.replace('"', '""') + '"*' for word in query.split())
+        if not terms:
+            return []
+        return self.cursor.execute("SELECT rowid, project_id, body FROM search WHERE search MATCH ? LIMIT ?", (terms, limit)).fetchall()
+
+    def pull_scans(self):
+        rows = self.cursor.execute("SELECT project_id, mtime, head, branch, dirty, last_modified, file_count FROM scan_cache").fetchall()
+        return {pid: ((mtime, head), ScanInfo(branch, bool(dirty), last_modified, file_count)) for pid, mtime, head, branch, dirty, last_modified, file_count in rows}
+
+    def save_scans(self, results):
+        # results of (project_id, (mtime, head), ScanInfo) from the scanner; a None key means the path is gone
+        self.cursor.executemany("INSERT OR REPLACE INTO scan_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                [(pid, key[0], key[1], info.branch, info.dirty, info.last_modified, info.file_count) for pid, key, info in results if key])
+        self.cursor.executemany("DELETE FROM scan_cache WHERE project_id = ?", [(pid,) for pid, key, _ in results if key is None])
+        self.commit()
+
+    def pull_stats(self, weeks=STATS_WEEKS):
+        # Reads only the aggregate tables, so the cost does not grow with history
+        now = time.time()
+        dwell = {status: total / exits for status, exits, total in self.cursor.execute("SELECT status, exits, total_seconds FROM status_dwell").fetchall() if exits}
+        occupancy = {status: (projects, now - since_total / projects)
+                     for status, projects, since_total in self.cursor.execute("SELECT status, projects, since_total FROM status_occupancy").fetchall() if projects}
+        flow = self.cursor.execute("SELECT week, finished, cycle_count, cycle_seconds FROM weekly_flow ORDER BY week DESC LIMIT ?", (weeks,)).fetchall()
+        return dwell, occupancy, flow
+
     def pull_todo_data(self, id):
-        return self.cursor.execute("SELECT * FROM todo WHERE project_id = ? and deleted = ?", (id, 0)).fetchall()
+        return self.rows(todo_row, f"SELECT {TODO_COLUMNS} FROM todo WHERE project_id = ? AND deleted = 0", (id,)).fetchall()
+
+    def pull_todo_page(self, id, offset, limit):
+        # Walks the partial idx_todo_live in id order (no sort step), so a page costs offset + limit index steps
+        return self.rows(todo_row, f"SELECT {TODO_COLUMNS} FROM todo WHERE project_id = ? AND deleted = 0 ORDER BY id LIMIT ? OFFSET ?", (id, limit, offset)).fetchall()
+
+    def count_todo(self, id):
+        return self.cursor.execute("SELECT COUNT(*) FROM todo WHERE project_id = ? AND deleted = 0", (id,)).fetchone()[0]
+
+    def longest_todo(self, id):
+        return self.cursor.execute("SELECT IFNULL(MAX(LENGTH(description)), 0) FROM todo WHERE project_id = ? AND deleted = 0", (id,)).fetchone()[0]
 
     def get_card_data(self, column, card_id):
         return self.cursor.execute(f"SELECT {column} FROM projects WHERE id = ?", (card_id,)).fetchone()
 
     def progress(self, name, current_status):
-        self.cursor.execute("UPDATE projects SET status = ? WHERE name = ?", (list(STATUSES.keys())[current_status + 1], name,))
-        self.conn.commit()
+        self.cursor.execute("UPDATE projects SET status = ? WHERE name = ?", (STATUS_NAMES[current_status + 1], name,))
+        self.commit()
 
     def regress(self, name, current_status):
-        self.cursor.execute("UPDATE projects SET status = ? WHERE name = ?", (list(STATUSES.keys())[current_status - 1], name,))
-        self.conn.commit()
+        self.cursor.execute("UPDATE projects SET status = ? WHERE name = ?", (STATUS_NAMES[current_status - 1], name,))
+        self.commit()
 
     def increment_priority(self, name, current_priority):
         self.cursor.execute("UPDATE projects SET priority = ? WHERE name = ?", (current_priority + 1, name,))
-        self.conn.commit()
+        self.commit()
 
     def decrement_priority(self, name, current_priority):
         self.cursor.execute("UPDATE projects SET priority = ? WHERE name = ?", (current_priority - 1, name,))
-        self.conn.commit()
+        self.commit()
 
     def add_project(self, name, description, path, file, status, language):
         self.cursor.execute(f"INSERT INTO projects (name, description, path, file, status, language) \
             VALUES (?, ?, ?, ?, ?, ?)", (name, description, path, file, status, language ))
-        self.conn.commit()
+        self.commit()
+        return self.cursor.lastrowid
+
+    def pull_project(self, id):
+        return self.rows(project_row, PULL_PROJECT, (id,)).fetchone()
+
+    def move_project(self, id, priority, rank):
+        # A reorder is one row: the new priority and a rank between the new neighbours
+        self.cursor.execute("UPDATE projects SET priority = ?, rank = ? WHERE id = ?", (priority, rank, id))
+        self.commit()
+
+    def rebalance(self, status):
+        # Fractional ranks ran out of room between two cards; respace the column and return {id: rank}
+        self.cursor.execute(f'''
+            UPDATE projects SET rank = ordered.n * {RANK_STEP}
+            FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY priority DESC, rank, id) AS n FROM projects WHERE status = ?) AS ordered
+            WHERE projects.id = ordered.id
+        ''', (status,))
+        self.commit()
+        return dict(self.cursor.execute("SELECT id, rank FROM projects WHERE status = ?", (status,)).fetchall())
+
+    def add_projects(self, rows):
+        # rows of (name, description, path, file, status, language)
+        self.cursor.executemany("INSERT INTO projects (name, description, path, file, status, language) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.commit()
+
+    def add_items(self, rows):
+        # rows of (description, project_id)
+        self.cursor.executemany("INSERT INTO todo (description, priority, deleted, project_id) VALUES (?, 0, 0, ?)", rows)
+        self.commit()
+
+    def export_projects(self):
+        return self.conn.execute("SELECT name, description, path, file, priority, status, language FROM projects ORDER BY id")
+
+    def export_todos(self):
+        return self.conn.execute('''
+            SELECT p.name, t.description, t.priority FROM todo t
+            JOIN projects p ON p.id = +t.project_id
+            WHERE t.deleted = 0 ORDER BY t.id
+        ''')
+
+    def import_projects(self, rows):
+        # Upsert on name, so re-importing an export updates projects in place
+        return self.import_rows('''
+            INSERT INTO projects (name, description, path, file, priority, status, language) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET description = excluded.description, path = excluded.path, file = excluded.file,
+                priority = excluded.priority, status = excluded.status, language = excluded.language
+            WHERE (description, path, file, priority, status, language)
+                IS NOT (excluded.description, excluded.path, excluded.file, excluded.priority, excluded.status, excluded.language)
+        ''', rows)
+
+    def import_todos(self, rows):
+        # rows of (description, priority, project name); todos of unknown projects are skipped
+        return self.import_rows('''
+            INSERT INTO todo (description, priority, deleted, project_id) SELECT ?, ?, 0, id FROM projects WHERE name = ?
+            ON CONFLICT (description) WHERE deleted = 0 DO UPDATE SET priority = excluded.priority, project_id = excluded.project_id
+            WHERE (priority, project_id) IS NOT (excluded.priority, excluded.project_id)
+        ''', rows)
+
+    def import_rows(self, statement, rows):
+        # One transaction for the whole stream, fed to executemany in fixed-size batches
+        # count is rows written: todos of unknown projects and unchanged duplicates write nothing
+        rows = iter(rows)
+        count = 0
+        self.flush()
+        try:
+            while batch := list(islice(rows, IMPORT_BATCH_SIZE)):
+                self.cursor.executemany(statement, batch)
+                count += self.cursor.rowcount
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return count
+
+    def set_statuses(self, rows):
+        # rows of (status, id); the whole selection is one statement and one commit
+        self.cursor.executemany("UPDATE projects SET status = ? WHERE id = ?", rows)
+        self.commit()
+
+    def set_priorities(self, rows):
+        # rows of (priority, id)
+        self.cursor.executemany("UPDATE projects SET priority = ? WHERE id = ?", rows)
+        self.commit()
+
+    def delete_projects(self, ids):
+        self.cursor.executemany("DELETE FROM projects WHERE id = ?", [(id,) for id in ids])
+        self.commit()
+
+    def delete_items(self, item_ids, card_id):
+        self.cursor.executemany(f"UPDATE todo SET deleted = 1, deleted_at = {NOW} WHERE id = ? AND project_id = ?", [(id, card_id) for id in item_ids])
+        self.commit()
+        return self.count_todo(card_id)
+
+    def move_items(self, item_ids, card_id, target_id):
+        # Returns the live todo counts of the source and target projects
+        self.cursor.executemany("UPDATE todo SET project_id = ? WHERE id = ? AND project_id = ?", [(target_id, id, card_id) for id in item_ids])
+        self.commit()
+        return self.count_todo(card_id), self.count_todo(target_id)
+
+    def archive_step(self, max_age=ARCHIVE_AGE_SECONDS, batch=ARCHIVE_BATCH_SIZE):
+        # One bounded batch: move old deleted todos to todo_archive, then give back a few free pages.
+        # Returns True while more work is left, so idle ticks can keep each step short
+        self.flush()
+        cutoff = time.time() - max_age
+        ids = [(id,) for (id,) in self.cursor.execute("SELECT id FROM todo WHERE deleted = 1 AND deleted_at < ? LIMIT ?", (cutoff, batch)).fetchall()]
+        if ids:
+            self.cursor.executemany(f'''
+                INSERT OR REPLACE INTO todo_archive SELECT id, description, priority, project_id, deleted_at, {NOW} FROM todo WHERE id = ?
+            ''', ids)
+            self.cursor.executemany("DELETE FROM todo WHERE id = ?", ids)
+            self.conn.commit()
+        free = 0
+        if self.cursor.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2:
+            self.cursor.execute(f"PRAGMA incremental_vacuum({ARCHIVE_VACUUM_PAGES});").fetchall()
+            free = self.cursor.execute("PRAGMA freelist_count;").fetchone()[0]
+        log.debug("Archived %d todos, %d free pages left", len(ids), free)
+        return len(ids) == batch or free > 0
+
+    def compact(self, max_age=ARCHIVE_AGE_SECONDS):
+        # Offline: archive everything eligible, switch to incremental auto-vacuum and rebuild the file
+        before = self.cursor.execute("SELECT COUNT(*) FROM todo_archive").fetchone()[0]
+        while self.archive_step(max_age):
+            pass
+        self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        self.cursor.execute("VACUUM;")
+        return self.cursor.execute("SELECT COUNT(*) FROM todo_archive").fetchone()[0] - before
+
+    def todo_project(self, item_id):
+        row = self.cursor.execute("SELECT project_id FROM todo WHERE id = ? AND deleted = 0", (item_id,)).fetchone()
+        return row[0] if row else None
 
     def delete_project(self, card_id):
         self.cursor.execute(f"DELETE FROM projects WHERE id = ?", (card_id,))
-        self.conn.commit()
+        self.commit()
 
     def edit_project(self, new_value_column, new_value, card_id):
         self.cursor.execute(f"UPDATE projects SET {new_value_column} = ? WHERE id = ?", (new_value, card_id,))
-        self.conn.commit()
+        self.commit()
 
     def add_item(self, new_item, card_id):
         self.cursor.execute("INSERT INTO todo (description, priority, deleted, project_id) VALUES (?, ?, ?, ?)", (new_item, 0, False, card_id))
-        self.conn.commit()
-        return self.pull_todo_data(card_id)
+        self.commit()
+        return self.count_todo(card_id)
 
     def edit_item(self, item_id, new_description, card_id):
         self.cursor.execute("UPDATE todo SET description = ? WHERE id = ? AND project_id = ?", (new_description, item_id, card_id,))
-        self.conn.commit()
-        return self.pull_todo_data(card_id)
+        self.commit()
+        return self.count_todo(card_id)
 
     def delete_item(self, item_id, card_id):
-        self.cursor.execute("UPDATE todo SET deleted = ? WHERE id = ?", (1, item_id,))
-        self.conn.commit()
-        return self.pull_todo_data(card_id)
+        self.cursor.execute(f"UPDATE todo SET deleted = 1, deleted_at = {NOW} WHERE id = ?", (item_id,))
+        self.commit()
+        return self.count_todo(card_id)
 
 
@@ -0,0 +1,106 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: index.py
+#
+
+#
+# In-memory project index for projectarium
+#
+
+from bisect import bisect_left
+
+from config import *
+
+
+def sort_key(project):
+    # Mirrors ORDER BY priority DESC, rank; id breaks ties so keys are unique
+    return (-project.priority, project.rank, project.id)
+
+
+class ProjectIndex:
+    def __init__(self):
+        self.by_id = {}
+        self.columns = {status: [] for status in STATUSES}
+        self.keys = {status: [] for status in STATUSES}
+        self.dirty = set()
+
+    def load(self, projects):
+        self.by_id = {project.id: project for project in projects}
+        self.columns = {status: [] for status in STATUSES}
+        for project in projects:
+            if self.shown(project):
+                self.columns[project.status].append(project)
+        for status, column in self.columns.items():
+            column.sort(key=sort_key)
+            self.keys[status] = [sort_key(project) for project in column]
+        self.dirty = set(STATUSES)
+
+    def get(self, project_id):
+        return self.by_id.get(project_id)
+
+    def column(self, status):
+        return self.columns[status]
+
+    def position(self, project):
+        return bisect_left(self.keys[project.status], sort_key(project))
+
+    def shown(self, project):
+        # Rows written by other tools can carry a status with no column; they stay in by_id but off the board
+        if project.status in self.columns:
+            return True
+        log.warning("Project %d has unknown status %r; not shown", project.id, project.status)
+        return False
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def add(self, project):
+        self.by_id[project.id] = project
+        self._insert(project)
+        return project
+
+    def remove(self, project_id):
+        project = self.by_id.pop(project_id, None)
+        if project:
+            self._remove(project)
+        return project
+
+    def update(self, project_id, **changes):
+        project = self.by_id[project_id]
+        if "status" in changes or "priority" in changes or "rank" in changes:
+            # Ordering fields changed, so re-slot the project
+            self._remove(project)
+            for field, value in changes.items():
+                setattr(project, field, value)
+            self._insert(project)
+        else:
+            for field, value in changes.items():
+                setattr(project, field, value)
+            if project.status in self.columns:
+                self.dirty.add(project.status)
+        return project
+
+    def rerank(self, status, ranks):
+        # Ranks were respaced without changing the order, so only the keys need rebuilding
+        for project in self.columns[status]:
+            project.rank = ranks[project.id]
+        self.keys[status] = [sort_key(project) for project in self.columns[status]]
+
+    def _insert(self, project):
+        if not self.shown(project):
+            return
+        key = sort_key(project)
+        i = bisect_left(self.keys[project.status], key)
+        self.keys[project.status].insert(i, key)
+        self.columns[project.status].insert(i, project)
+        self.dirty.add(project.status)
+
+    def _remove(self, project):
+        if project.status not in self.columns:
+            return
+        i = self.position(project)
+        del self.keys[project.status][i]
+        del self.columns[project.status][i]
+        self.dirty.add(project.status)
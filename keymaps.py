@@ -0,0 +1,100 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: keymaps.py
+#
+
+#
+# Key bindings for projectarium
+#
+
+from config import *
+
+
+def build_keymaps(sm, ring=None):
+    todo_keymap = {
+        "q":        lambda:   sm.quit_todo(),
+        "a":        lambda:   sm.add_item(),
+        "KEY_UP":   lambda:   sm.tm.up(),       # pyright: ignore[reportOptionalMemberAccess]
+        "KEY_DOWN": lambda:   sm.tm.down(),     # pyright: ignore[reportOptionalMemberAccess]
+        "d":        lambda:   sm.delete_item(),
+        "e":        lambda:   sm.edit_item(),
+        " ":        lambda:   sm.tm.toggle(),           # pyright: ignore[reportOptionalMemberAccess]
+        "V":        lambda:   sm.tm.toggle_visual(),    # pyright: ignore[reportOptionalMemberAccess]
+        "M":        lambda:   sm.move_items(),
+        "h":        lambda:   sm.todo_move(sm.left),
+        "l":        lambda:   sm.todo_move(sm.right),
+        "k":        lambda:   sm.todo_move(sm.up),
+        "j":        lambda:   sm.todo_move(sm.down),
+    }
+
+
+    keymap = {
+        "q":    lambda: exit(0),
+        "\x1b": lambda: sm.escape(),
+
+        "a": lambda:  sm.add_project(),
+        "d": lambda:  sm.delete_project(),
+        "e": lambda:  sm.edit_project(),
+
+        "c": lambda:  sm.open_dir(),
+        "C": lambda:  sm.open_dir(True),
+        "n": lambda:  sm.open_nvim(),
+        "N": lambda:  sm.open_nvim(True),
+        "b": lambda:  sm.open_both(),
+        "B": lambda:  sm.open_both(True),
+        "x": lambda:  sm.open_tmux(),
+        "X": lambda:  sm.open_tmux(True),
+        "t": lambda:  sm.open_todo(),
+        "p": lambda:  sm.progress(),
+        "r": lambda:  sm.regress(),
+        "+": lambda:  sm.increment_priority(),
+        "-": lambda:  sm.decrement_priority(),
+
+        "KEY_LEFT":   lambda:  sm.left(),
+        "KEY_RIGHT":  lambda:  sm.right(),
+        "KEY_UP":     lambda:  sm.up(),
+        "KEY_DOWN":   lambda:  sm.down(),
+
+        " ": lambda:  sm.toggle_select(),
+        "V": lambda:  sm.toggle_visual(),
+        "o": lambda:  sm.open_reorder(),
+        "m": lambda:  sm.next_mode(),
+        "/": lambda:  sm.open_search(),
+        "S": lambda:  sm.open_stats(),
+        "w": lambda:  sm.start_backup(),
+    }
+    reorder_keymap = {
+        "o":        lambda:   sm.quit_reorder(),
+        "q":        lambda:   sm.quit_reorder(),
+        "\x1b":     lambda:   sm.quit_reorder(),
+        "\n":       lambda:   sm.quit_reorder(),
+        "KEY_UP":   lambda:   sm.move_up(),
+        "KEY_DOWN": lambda:   sm.move_down(),
+        "k":        lambda:   sm.move_up(),
+        "j":        lambda:   sm.move_down(),
+        "g":        lambda:   sm.move_top(),
+        "G":        lambda:   sm.move_bottom(),
+        "#":        lambda:   sm.move_to(),
+    }
+
+    if ring:
+        keymap["L"] = lambda: log.warning("Dumped %d log records to %s", ring.dump(), LOG_DUMP_PATH)
+
+    return keymap, todo_keymap, reorder_keymap
+
+
+def handle_key(sm, keymap, todo_keymap, reorder_keymap, key) -> bool:
+    if key == "KEY_RESIZE":
+        sm.resize()
+        return True
+    if sm.stats:
+        sm.quit_stats()
+        return True
+    if sm.in_search:
+        sm.search_key(key)
+        return True
+    active_keymap = todo_keymap if sm.in_todo else reorder_keymap if sm.in_reorder else keymap
+    if key not in active_keymap: return False
+    active_keymap[key]()
+    return True
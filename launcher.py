@@ -0,0 +1,64 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: launcher.py
+#
+
+#
+# Non-blocking launcher for terminals, editors and tmux sessions
+#
+
+import subprocess
+from collections import deque
+
+from config import *
+
+
+def command(template, **fields):
+    return [arg.format(**fields) for arg in template]
+
+
+class Launcher:
+    def __init__(self, max_running=LAUNCHER_MAX_RUNNING):
+        self.max_running = max_running
+        self.running = []
+        self.pending = deque()
+        self.status = ""
+
+    def launch(self, label, argv):
+        self.pending.append((label, argv))
+        self.pump()
+
+    def pump(self, force=False):
+        while self.pending and (force or len(self.running) < self.max_running):
+            label, argv = self.pending.popleft()
+            try:
+                # New session so children outlive the TUI and never touch its terminal
+                process = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                           stderr=subprocess.DEVNULL, start_new_session=True)
+            except OSError as e:
+                log.warning("Failed to launch %s: %s", label, e)
+                self.status = f"{label}: {e.strerror or e}"
+                continue
+            self.running.append((label, process))
+            self.status = f"{label}: started"
+
+    def reap(self) -> bool:
+        # Collect finished children and start queued launches; True when the status line changed
+        status = self.status
+        still_running = []
+        for label, process in self.running:
+            returncode = process.poll()
+            if returncode is None:
+                still_running.append((label, process))
+            elif returncode != 0:
+                self.status = f"{label}: exited {returncode}"
+            else:
+                self.status = f"{label}: done"
+        self.running = still_running
+        self.pump()
+        return status != self.status
+
+    def flush(self):
+        # Start everything still queued, used before the TUI exits
+        self.pump(force=True)
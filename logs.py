@@ -0,0 +1,41 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: logs.py
+#
+
+#
+# Level-gated logging into an in-memory ring buffer
+#
+
+import logging
+import time
+from collections import deque
+
+from config import *
+
+
+class RingBufferHandler(logging.Handler):
+    def __init__(self, capacity=LOG_RING_CAPACITY):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    def emit(self, record):
+        # Keep the record unformatted; the message is only built when dumped
+        self.records.append(record)
+
+    def dump(self, path=LOG_DUMP_PATH, reason="on demand"):
+        with open(path, "a") as f:
+            f.write(f"--- projectarium log dump ({reason}) {time.strftime('%Y-%m-%d %H:%M:%S')} ---\n")
+            for record in self.records:
+                f.write(self.format(record) + "\n")
+        return len(self.records)
+
+
+def setup_logging(level=LOG_LEVEL):
+    ring = RingBufferHandler()
+    root = logging.getLogger()
+    root.handlers = [ring]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    return ring
@@ -5,14 +5,14 @@
 #
 
 #
-# Dat classes for projectarium
+# Dat classes for projectarium, slotted so 100k projects stay small
 #
 
 from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Project:
     id: int
     name: str
@@ -23,9 +23,19 @@ class Project:
     status: str
     language: Optional[str]
     todo_count: int = 0  # derived, not stored in DB
+    rank: float = 0.0  # order within a priority, see DatabaseManager.move_project
+    scan: Optional["ScanInfo"] = None  # filled in by the background scanner
 
 
-@dataclass
+@dataclass(slots=True)
+class ScanInfo:
+    branch: str
+    dirty: bool
+    last_modified: float
+    file_count: int
+
+
+@dataclass(slots=True)
 class TodoItem:
     id: int
     description: str
@@ -0,0 +1,88 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: profiler.py
+#
+
+#
+# Frame-time profiler for --profile: phase timings per main loop frame, a rolling p50/p99 summary
+# for the command window, and a JSON Lines trace (plus optional cProfile stats) written on exit
+#
+
+import cProfile
+import json
+import time
+from collections import deque
+
+from config import *
+
+# In main loop order; a frame runs from one finished draw to the next
+PHASES = ("input", "key", "idle", "overlay", "state", "draw", "refresh")
+SUMMARY_PHASES = ("key", "state", "draw", "refresh", "busy")
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+
+class Profiler:
+    def __init__(self, trace_path=PROFILE_TRACE_PATH, cprofile_path=None, window=PROFILE_WINDOW):
+        self.trace_path = trace_path
+        self.trace = open(trace_path, "w")
+        self.cprofile_path = cprofile_path
+        self.cprofile = cProfile.Profile() if cprofile_path else None
+        self.samples = {phase: deque(maxlen=window) for phase in PHASES + ("busy",)}
+        self.current = dict.fromkeys(PHASES, 0)
+        self.frames = 0
+        self.started = self.last = self.frame_start = time.perf_counter_ns()
+        self.next_overlay = 0
+
+    def start(self):
+        if self.cprofile:
+            self.cprofile.enable()
+        self.last = self.frame_start = time.perf_counter_ns()
+
+    def lap(self, phase):
+        # Charge the time since the previous lap to phase
+        now = time.perf_counter_ns()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end_frame(self, keys=()):
+        busy = self.last - self.frame_start - self.current["input"]
+        # Idle frames only time out of getkey, so they would drown the key-driven phases in zeros
+        if not keys:
+            if self.current["idle"]:
+                self.samples["idle"].append(self.current["idle"])
+        else:
+            for phase, ns in self.current.items():
+                self.samples[phase].append(ns)
+            self.samples["busy"].append(busy)
+        record = {"frame": self.frames, "t_ms": round((self.frame_start - self.started) / 1e6, 3), "pressed": list(keys)}
+        record.update((phase, round(ns / 1e6, 3)) for phase, ns in self.current.items())
+        record["busy"] = round(busy / 1e6, 3)
+        self.trace.write(json.dumps(record) + "\n")
+        self.frames += 1
+        self.current = dict.fromkeys(PHASES, 0)
+        self.frame_start = self.last
+
+    def overlay_due(self):
+        now = time.monotonic()
+        if now < self.next_overlay:
+            return False
+        self.next_overlay = now + PROFILE_OVERLAY_SECONDS
+        return True
+
+    def summary(self):
+        parts = [f"{phase} {percentile(self.samples[phase], 0.5) / 1e6:.2f}/{percentile(self.samples[phase], 0.99) / 1e6:.2f}"
+                 for phase in SUMMARY_PHASES if self.samples[phase]]
+        return "p50/p99 ms " + " ".join(parts) if parts else "profiling"
+
+    def close(self):
+        self.trace.close()
+        log.info("Wrote %d frame timings to %s", self.frames, self.trace_path)
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_path)
+            log.info("Wrote cProfile stats to %s", self.cprofile_path)
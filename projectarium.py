@@ -12,143 +12,249 @@
 #
 
 
+import argparse
+import atexit
 import curses
+import signal
 import sqlite3
 import os
 import sys
+import time
 
 
-import logging
-logging.basicConfig(filename='debug.log', level=logging.DEBUG, filemode='w', format='%(asctime)s - %(levelname)s - %(message)s')
-os.system("touch debug.log")  # Create the log file if it doesn't exist
-
 from config import *
+from logs import setup_logging
 
 from ccolors import *       # pyright: ignore[reportWildcardImportFromLibrary]
 from cinput import *       # pyright: ignore[reportWildcardImportFromLibrary]
 
 import state
 import db
+import server
+import transfer
+from keymaps import build_keymaps, handle_key
+from profiler import Profiler
+from record import Recorder, RecordingCommandWindow
 from ui.layout import *
-
-
-# Configure curses
-stdscr = curses.initscr()
-curses.start_color()
-curses.use_default_colors()
-init_16_colors()
-
-SCREEN_HEIGHT, SCREEN_WIDTH = stdscr.getmaxyx()
-SECTION_HEIGHT          = (SCREEN_HEIGHT - COMMAND_WINDOW_HEIGHT)
-SECTION_WIDTH           = (SCREEN_WIDTH - (3 * X_PAD)) // 4 # right-hand padding
-
-
-def init():
+from ui.render import Renderer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="projectarium", description="Kanban board TUI for your projects")
+    parser.add_argument("--write-behind", action="store_true", default=WRITE_BEHIND,
+                        help="batch database writes and commit them when idle, on quit, or when the queue fills")
+    parser.add_argument("--log-level", default=LOG_LEVEL,
+                        help="lowest level kept in the in-memory log ring (DEBUG, INFO, WARNING, ...)")
+    parser.add_argument("--no-scan", action="store_true",
+                        help="skip the background scan of project directories")
+    parser.add_argument("--seed", action="store_true",
+                        help="fill an empty database with the example projects")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each frame's phases, show p50/p99 in the command window and write a trace on exit")
+    parser.add_argument("--profile-trace", default=PROFILE_TRACE_PATH, help="JSON Lines file for the --profile frame trace")
+    parser.add_argument("--cprofile", help="also write cProfile stats of the main loop to this file (implies --profile)")
+    parser.add_argument("--record", metavar="DIR",
+                        help="save a database snapshot and every key and prompt answer to DIR, for python -m bench.replay")
+
+    commands = parser.add_subparsers(dest="command")
+    for name, verb in (("export", "write"), ("import", "read")):
+        command = commands.add_parser(name, help=f"{verb} projects (or todos) as JSON Lines or CSV without the TUI")
+        command.add_argument("file", nargs="?", default="-", help="file to " + verb + ", - for std" + ("out" if name == "export" else "in"))
+        command.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+        command.add_argument("--todos", action="store_true", help="todos instead of projects")
+    command = commands.add_parser("serve", help="serve the board as a local HTTP/JSON API")
+    command.add_argument("--host", default=SERVE_HOST)
+    command.add_argument("--port", type=int, default=SERVE_PORT)
+    command.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    command.add_argument("--readers", type=int, default=SERVE_READERS, help="read connections in the pool")
+    command = commands.add_parser("compact", help="archive old deleted todos and rebuild the database file")
+    command.add_argument("--days", type=float, default=ARCHIVE_AGE_SECONDS / 86400, help="archive todos deleted at least this long ago")
+    return parser.parse_args()
+
+def db_path():
+    return DB_PATH if sys.argv[0][-3:] == ".py" else PROD_DB_PATH
+
+def connect():
+    # Connect to database (or create it if it doesn't exist)
+    return sqlite3.connect(db_path())
+
+def run_command(args):
+    if args.command == "serve":
+        print(f"serving {db_path()} on {args.socket or f'http://{args.host}:{args.port}'}", file=sys.stderr)
+        try:
+            server.serve(db_path(), args.host, args.port, args.socket, args.readers)
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            sys.exit(f"serve failed: {e}")
+        return
+    dm = db.DatabaseManager(connect())
+    if args.command == "compact":
+        before = os.path.getsize(db_path())
+        count = dm.compact(args.days * 86400)
+        print(f"archived {count} todos, {before} -> {os.path.getsize(db_path())} bytes", file=sys.stderr)
+    elif args.command == "export":
+        out = sys.stdout if args.file == "-" else open(args.file, "w", newline="")
+        try:
+            with out:
+                transfer.export_data(dm, out, args.format, args.todos)
+        except BrokenPipeError:
+            # Reader went away (e.g. piped into head); stop quietly
+            sys.stderr.close()
+    else:
+        inp = sys.stdin if args.file == "-" else open(args.file, newline="")
+        with inp:
+            try:
+                count = transfer.import_data(dm, inp, args.format, args.todos)
+            except (ValueError, sqlite3.Error) as e:
+                sys.exit(f"import failed, nothing was written: {e}")
+        print(f"imported {count} {'todos' if args.todos else 'projects'}", file=sys.stderr)
+
+def flush_on_exit(dm):
+    atexit.register(dm.flush)
+
+    def handle_signal(signum, frame):
+        dm.flush()
+        exit(128 + signum)
+
+    for signum in (signal.SIGTERM, signal.SIGHUP, signal.SIGINT):
+        signal.signal(signum, handle_signal)
+
+def init(stdscr, args):
+    # curses.wrapper has already called initscr and start_color
+    curses.use_default_colors()
+    init_16_colors()
     stdscr.clear()
 
     curses.curs_set(0)
     curses.noecho()
     curses.set_escdelay(1)
     stdscr.keypad(True)
+    stdscr.timeout(IDLE_TIMEOUT_MS)
 
     stdscr.refresh()
 
 
-    # Connect to database (or create it if it doesn't exist)
-    if sys.argv[0][-3:] == ".py":
-        conn = sqlite3.connect(DB_PATH)
-    else:
-        conn = sqlite3.connect(PROD_DB_PATH)
+    conn = connect()
 
     cw = CommandWindow()
         
-    dm = db.DatabaseManager(conn)
-    dm.init()
+    dm = db.DatabaseManager(conn, write_behind=args.write_behind)
+    if args.write_behind:
+        flush_on_exit(dm)
+    if args.seed:
+        dm.init_populate()
     log.info("Database initialized")
 
-    windows = [Window(i, curses.newwin(SECTION_HEIGHT, SECTION_WIDTH, 0, ((i) * SECTION_WIDTH) + (i * X_PAD)), list(STATUSES.keys())[i], color=STATUSES[list(STATUSES.keys())[i]][1]) for i in range(4)]
+    windows = build_windows(curses.LINES, curses.COLS)
 
     sm = state.StateManager(dm, cw)
+    sm.windows = windows
     sm.init()
+    if not args.no_scan:
+        sm.start_scanner()
+    sm.start_backups()
+    sm.sync_windows()
     log.info("State initialized")
 
-    for window in windows:
-        projects = sm.get_projects_by_status(window.title)
-        for project in projects:
-            window.add_card(project)
-
     return sm, windows
 
-def draw_windows(windows, active_window, active_card, mode=0):
-    for window in windows:
-        window.win.clear()
-        window.draw_window(active_window, active_card, mode)
-        window.win.refresh()
-
-def main(stdscr):
-    sm, windows = init()
+def main(stdscr, args, ring, started):
+    sm, windows = init(stdscr, args)
+    renderer = Renderer(windows)
     sm.draw_cw() # TODO: basically, this needs to draw only cw
 
-    todo_keymap = {
-        "q":        lambda:   sm.quit_todo(),
-        "a":        lambda:   sm.add_item(),
-        "KEY_UP":   lambda:   sm.tm.up(),       # pyright: ignore[reportOptionalMemberAccess]
-        "KEY_DOWN": lambda:   sm.tm.down(),     # pyright: ignore[reportOptionalMemberAccess]
-        "d":        lambda:   sm.delete_item(),
-        "e":        lambda:   sm.edit_item(),
-        "h":        lambda:   sm.left(),
-        "l":        lambda:   sm.right(),
-        "k":        lambda:   sm.up(),
-        "j":        lambda:   sm.down(),
-    }
-
-
-    keymap = {
-        "q":    lambda: exit(0),
-        "\x1b": lambda: exit(0),
-
-        "a": lambda:  sm.add_project(),
-        "d": lambda:  sm.delete_project(),
-        "e": lambda:  sm.edit_project(),
-
-        "c": lambda:  sm.open_dir(),
-        "C": lambda:  sm.open_dir(True),
-        "n": lambda:  sm.open_nvim(),
-        "N": lambda:  sm.open_nvim(True),
-        "b": lambda:  sm.open_both(),
-        "B": lambda:  sm.open_both(True),
-        "x": lambda:  sm.open_tmux(),
-        "X": lambda:  sm.open_tmux(True),
-        "t": lambda:  sm.open_todo(),
-        "p": lambda:  sm.progress(),
-        "r": lambda:  sm.regress(),
-        "+": lambda:  sm.increment_priority(),
-        "-": lambda:  sm.decrement_priority(),
-
-        "KEY_LEFT":   lambda:  sm.left(),
-        "KEY_RIGHT":  lambda:  sm.right(),
-        "KEY_UP":     lambda:  sm.up(),
-        "KEY_DOWN":   lambda:  sm.down(),
-
-        "m": lambda:  sm.next_mode(),
-    }
-
+    keymap, todo_keymap, reorder_keymap = build_keymaps(sm, ring)
+
+    renderer.draw(sm)
+    log.info("First frame after %.1fms (budget %dms)", (time.perf_counter() - started) * 1000, STARTUP_BUDGET_MS)
+
+    profiler = None
+    if args.profile or args.cprofile:
+        profiler = Profiler(args.profile_trace, args.cprofile)
+        renderer.profiler = sm.profiler = profiler
+        profiler.start()
+    recorder = None
+    if args.record:
+        recorder = Recorder(args.record, sm.dm, curses.LINES, curses.COLS)
+        sm.cw = RecordingCommandWindow(sm.cw, recorder)
+    try:
+        loop(stdscr, sm, renderer, profiler, recorder, keymap, todo_keymap, reorder_keymap)
+    finally:
+        if recorder:
+            recorder.close(sm.dm)
+        if profiler:
+            profiler.close()
+
+def dispatch(stdscr, sm, profiler, recorder, keymaps, key):
+    if profiler:
+        profiler.lap("input")
+    if recorder:
+        recorder.key(key, stdscr.getmaxyx() if key == "KEY_RESIZE" else None)
+    if key == "KEY_RESIZE":
+        # Clear the gutters between columns; the columns themselves are redrawn in full
+        stdscr.erase()
+        stdscr.noutrefresh()
+    handle_key(sm, *keymaps, key)
+    if profiler:
+        profiler.lap("key")
+
+def loop(stdscr, sm, renderer, profiler, recorder, keymap, todo_keymap, reorder_keymap):
+    keymaps = (keymap, todo_keymap, reorder_keymap)
+    keys = []
     while True:
         # draw ui
-        draw_windows(windows, sm.active_window, sm.active_card)
-
-        log.info(f"Active window: {sm.get_active_window()} | Active card: {sm.get_active_card().name} | Mode: {sm.mode}")
-
-        # get and handle input
-        key = stdscr.getkey()
-        if sm.in_todo:
-            if key not in todo_keymap: continue
-            todo_keymap[key]()
-        else: 
-            if key not in keymap: continue
-            keymap[key]()
+        renderer.draw(sm)
+        last_draw = time.monotonic()
+        if recorder and keys:
+            recorder.frame()
+        if profiler:
+            profiler.end_frame(keys)
+            if profiler.overlay_due():
+                sm.draw_cw()
+                profiler.lap("overlay")
+
+        if log.isEnabledFor(logging.DEBUG) and sm.get_active_window_projects():
+            log.debug("Active window: %s | Active card: %s | Mode: %d", sm.get_active_window(), sm.get_active_card().name, sm.mode)
+
+        # get and handle input, doing background work while no key arrives
+        try:
+            keys = [stdscr.getkey()]
+        except curses.error:
+            keys = []
+            if profiler:
+                profiler.lap("input")
+            sm.idle()
+            if profiler:
+                profiler.lap("idle")
+            continue
+        dispatch(stdscr, sm, profiler, recorder, keymaps, keys[0])
+
+        # Apply everything already queued (key repeat) in order and draw once. Keys are read one at a time,
+        # so a prompt opened by one of them still reads its own input. Waits only if the last frame was under
+        # 1 / FRAME_RATE ago, and a flood of keys still gets a frame every INPUT_BATCH_SECONDS
+        batch_end = time.monotonic() + INPUT_BATCH_SECONDS
+        while (now := time.monotonic()) < batch_end:
+            stdscr.timeout(max(0, int((last_draw + 1 / FRAME_RATE - now) * 1000)))
+            try:
+                keys.append(stdscr.getkey())
+            except curses.error:
+                break
+            dispatch(stdscr, sm, profiler, recorder, keymaps, keys[-1])
+        stdscr.timeout(IDLE_TIMEOUT_MS)
 
 
 if __name__ == "__main__":
-    curses.wrapper(main)
+    started = time.perf_counter()
+    args = parse_args()
+    ring = setup_logging(args.log_level)
+    if args.command:
+        run_command(args)
+        sys.exit(0)
+    try:
+        curses.wrapper(main, args, ring, started)
+    except Exception:
+        log.exception("projectarium crashed")
+        ring.dump(reason="crash")
+        raise
 
@@ -0,0 +1,72 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: record.py
+#
+
+#
+# Session recording for --record: a database snapshot, then every key and prompt answer with its time and
+# a marker after each frame that handled keys, closed by a hash of the final state so bench.replay can check a replay ends in the same place
+#
+
+import json
+import os
+import time
+
+from config import *
+
+
+class Recorder:
+    def __init__(self, directory, dm, lines, cols):
+        os.makedirs(directory, exist_ok=True)
+        dm.snapshot(os.path.join(directory, RECORD_SNAPSHOT))
+        self.path = os.path.join(directory, RECORD_TRACE)
+        self.trace = open(self.path, "w")
+        self.started = time.monotonic()
+        self.write({"lines": lines, "cols": cols})
+
+    def write(self, record):
+        # Line buffered by hand so a crash still leaves every key before it
+        self.trace.write(json.dumps(record) + "\n")
+        self.trace.flush()
+
+    def elapsed(self):
+        return round(time.monotonic() - self.started, 4)
+
+    def key(self, key, size=None):
+        record = {"t": self.elapsed(), "key": key}
+        if size:
+            record["size"] = list(size)
+        self.write(record)
+
+    def frame(self):
+        # Keys since the last marker were applied together before one draw
+        self.write({"t": self.elapsed(), "frame": True})
+
+    def input(self, value):
+        self.write({"t": self.elapsed(), "input": value})
+
+    def close(self, dm):
+        self.write({"t": self.elapsed(), "end": dm.state_hash()})
+        self.trace.close()
+        log.info("Recorded session to %s", self.path)
+
+
+class RecordingCommandWindow:
+    # Passes everything through to the real command window, logging what the prompts return
+    def __init__(self, cw, recorder):
+        self.cw = cw
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.cw, name)
+
+    def get_input(self, *args, **kwargs):
+        value = self.cw.get_input(*args, **kwargs)
+        self.recorder.input(value)
+        return value
+
+    def make_selection(self, *args, **kwargs):
+        value = self.cw.make_selection(*args, **kwargs)
+        self.recorder.input(value)
+        return value
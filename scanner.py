@@ -0,0 +1,144 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: scanner.py
+#
+
+#
+# Background scanner for project directories (git state, last activity, size)
+#
+
+import os
+import queue
+import subprocess
+import threading
+import time
+
+from config import *
+from objects import ScanInfo
+
+
+def read_head(path):
+    # Resolve HEAD by reading .git directly so unchanged repos never spawn git
+    git = os.path.join(path, ".git")
+    try:
+        with open(os.path.join(git, "HEAD")) as f:
+            head = f.read().strip()
+    except OSError:
+        return None, None
+    if not head.startswith("ref: "):
+        return head, "(detached)"
+    ref = head[5:]
+    branch = ref.removeprefix("refs/heads/")
+    try:
+        with open(os.path.join(git, ref)) as f:
+            return f.read().strip(), branch
+    except OSError:
+        pass
+    try:
+        with open(os.path.join(git, "packed-refs")) as f:
+            for line in f:
+                if line.rstrip().endswith(" " + ref):
+                    return line.split()[0], branch
+    except OSError:
+        pass
+    return ref, branch
+
+def fingerprint(path):
+    # Directory mtime, git index mtime and HEAD; a match with the cache means no rescan
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    try:
+        index_mtime = os.stat(os.path.join(path, ".git", "index")).st_mtime_ns
+    except OSError:
+        index_mtime = 0
+    head, _ = read_head(path)
+    return f"{mtime}:{index_mtime}", head or ""
+
+def collect(path):
+    head, branch = read_head(path)
+    dirty = False
+    if head:
+        try:
+            status = subprocess.run(["git", "-C", path, "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, timeout=SCAN_GIT_TIMEOUT_SECONDS)
+            dirty = bool(status.stdout.strip())
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    file_count, last_modified = 0, 0.0
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and d not in SCAN_SKIP_DIRS]
+        for name in files:
+            try:
+                last_modified = max(last_modified, os.stat(os.path.join(root, name)).st_mtime)
+            except OSError:
+                continue
+            file_count += 1
+        if file_count >= SCAN_MAX_FILES:
+            break
+
+    return ScanInfo(branch or "", dirty, last_modified, file_count)
+
+
+class Scanner:
+    def __init__(self, workers=SCAN_WORKERS):
+        self.jobs = queue.SimpleQueue()
+        self.results = queue.SimpleQueue()
+        self.last_scan = 0.0
+        # Jobs submitted but not finished; a new batch waits until the last one is done
+        self.pending = 0
+        self.lock = threading.Lock()
+        # Daemon workers, so quitting never waits on a slow disk
+        for i in range(workers):
+            threading.Thread(target=self.work, name=f"scanner-{i}", daemon=True).start()
+
+    def submit(self, projects, cache):
+        # cache maps project id to the fingerprint of its last stored scan
+        self.last_scan = time.monotonic()
+        with self.lock:
+            self.pending += len(projects)
+        for project in projects:
+            self.jobs.put((project.id, project.path, cache.get(project.id)))
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                self.scan(*job)
+            finally:
+                with self.lock:
+                    self.pending -= 1
+
+    def scan(self, project_id, path, cached):
+        # A path that is gone or unreadable yields (project_id, None, None) once, so its stale scan is dropped
+        try:
+            key = fingerprint(path)
+            if key is None:
+                if cached is not None:
+                    self.results.put((project_id, None, None))
+                return
+            if key == cached:
+                return
+            info = collect(path)
+            # git status can refresh .git/index, so store the fingerprint as it is after the scan
+            if (key := fingerprint(path)) is None:
+                self.results.put((project_id, None, None))
+            else:
+                self.results.put((project_id, key, info))
+        except Exception:
+            log.exception("Scanning %s failed", path)
+
+    def due(self):
+        # A slow filesystem must not pile up duplicate batches behind the last one
+        return self.pending == 0 and time.monotonic() - self.last_scan >= SCAN_INTERVAL_SECONDS
+
+    def drain(self):
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
@@ -0,0 +1,240 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: server.py
+#
+
+#
+# Local HTTP/JSON API for projectarium, so scripts never duplicate the SQL in db.py
+#
+
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from urllib.parse import parse_qsl, urlsplit
+
+from config import *
+from db import DatabaseManager
+
+PROJECT_EDIT_FIELDS = set(EDIT_PROJECT_CHOICES) | {"priority", "status"}
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 409: "Conflict",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def require_project(dm, project_id):
+    if not (project := dm.pull_project(project_id)):
+        raise HTTPError(404, f"no project {project_id}")
+    return project
+
+def require_todo(dm, todo_id):
+    if (project_id := dm.todo_project(todo_id)) is None:
+        raise HTTPError(404, f"no todo {todo_id}")
+    return project_id
+
+
+# Write operations, shared by the single change endpoints and /batch
+def add_project(dm, name, path, description="", file="", status=NEW_PROJECT_STATUS, language=""):
+    if status not in STATUSES:
+        raise HTTPError(400, f"unknown status {status!r}")
+    return {"id": dm.add_project(name, description, path, file, status, language)}
+
+def edit_project(dm, id, **changes):
+    require_project(dm, id)
+    for field, value in changes.items():
+        if field not in PROJECT_EDIT_FIELDS:
+            raise HTTPError(400, f"{field!r} can not be edited")
+        if field == "status" and value not in STATUSES:
+            raise HTTPError(400, f"unknown status {value!r}")
+        if field == "priority" and not (isinstance(value, int) and 0 <= value <= 99):
+            raise HTTPError(400, "priority must be an integer from 0 to 99")
+        dm.edit_project(field, value, id)
+    return {"id": id}
+
+def delete_project(dm, id):
+    require_project(dm, id)
+    dm.delete_project(id)
+    return {"id": id}
+
+def add_todo(dm, project_id, description):
+    require_project(dm, project_id)
+    return {"todo_count": dm.add_item(description, project_id)}
+
+def edit_todo(dm, id, description):
+    return {"todo_count": dm.edit_item(id, description, require_todo(dm, id))}
+
+def delete_todo(dm, id):
+    return {"todo_count": dm.delete_item(id, require_todo(dm, id))}
+
+OPERATIONS = {
+    "add_project":      add_project,
+    "edit_project":     edit_project,
+    "delete_project":   delete_project,
+    "add_todo":         add_todo,
+    "edit_todo":        edit_todo,
+    "delete_todo":      delete_todo,
+}
+
+def run_operations(dm, operations):
+    results = []
+    for i, operation in enumerate(operations):
+        arguments = dict(operation)
+        op = arguments.pop("op", None)
+        if op not in OPERATIONS:
+            raise HTTPError(400, f"operation {i}: unknown op {op!r}")
+        try:
+            results.append(OPERATIONS[op](dm, **arguments))
+        except TypeError as e:
+            raise HTTPError(400, f"operation {i}: {e}")
+        except HTTPError as e:
+            raise HTTPError(e.status, f"operation {i}: {e}")
+    return results
+
+
+class Server:
+    def __init__(self, db_path, readers=SERVE_READERS):
+        # One writer thread serializes every change; reads go to a fixed pool of connections. The writer
+        # connects first so migrations have run before any reader opens
+        self.writer = DatabaseManager(sqlite3.connect(db_path, check_same_thread=False))
+        # WAL so readers are never blocked by the writer's open transaction
+        self.writer.conn.execute("PRAGMA journal_mode=WAL;")
+        self.write_pool = ThreadPoolExecutor(1, thread_name_prefix="writer")
+        self.readers = queue.SimpleQueue()
+        for _ in range(readers):
+            self.readers.put(DatabaseManager(sqlite3.connect(db_path, check_same_thread=False)))
+        self.read_pool = ThreadPoolExecutor(readers, thread_name_prefix="reader")
+
+    def with_reader(self, fn):
+        # As many connections as pool threads, so this never waits
+        dm = self.readers.get()
+        try:
+            return fn(dm)
+        finally:
+            self.readers.put(dm)
+
+    def with_writer(self, fn):
+        with self.writer.batch():
+            return fn(self.writer)
+
+    async def read(self, fn):
+        return await asyncio.get_running_loop().run_in_executor(self.read_pool, self.with_reader, fn)
+
+    async def write(self, fn):
+        return await asyncio.get_running_loop().run_in_executor(self.write_pool, self.with_writer, fn)
+
+    async def route(self, method, path, query, body):
+        parts = [part for part in path.split("/") if part]
+        match method, parts:
+            case "GET", ["projects"]:
+                return 200, await self.read(lambda dm: [asdict(p) for p in dm.pull_projects(query.get("status", ""))])
+            case "GET", ["projects", id]:
+                return 200, asdict(await self.read(lambda dm: require_project(dm, int(id))))
+            case "GET", ["projects", id, "todos"]:
+                return 200, await self.read(lambda dm: [asdict(t) for t in dm.pull_todo_data(require_project(dm, int(id)).id)])
+            case "GET", ["search"]:
+                return 200, await self.read(lambda dm: [{"project_id": pid, "text": text, "todo": rowid % 2 == 1}
+                                                        for rowid, pid, text in dm.search(query.get("q", ""), int(query.get("limit", SEARCH_LIMIT)))])
+            case "GET", ["stats"]:
+                dwell, occupancy, flow = await self.read(lambda dm: dm.pull_stats())
+                return 200, {"dwell": dwell, "occupancy": occupancy, "flow": flow}
+            case "POST", ["projects"]:
+                return 201, await self.write(lambda dm: add_project(dm, **body))
+            case "PATCH", ["projects", id]:
+                return 200, await self.write(lambda dm: edit_project(dm, int(id), **body))
+            case "DELETE", ["projects", id]:
+                return 200, await self.write(lambda dm: delete_project(dm, int(id)))
+            case "POST", ["projects", id, "todos"]:
+                return 201, await self.write(lambda dm: add_todo(dm, int(id), **body))
+            case "PATCH", ["todos", id]:
+                return 200, await self.write(lambda dm: edit_todo(dm, int(id), **body))
+            case "DELETE", ["todos", id]:
+                return 200, await self.write(lambda dm: delete_todo(dm, int(id)))
+            case "POST", ["batch"]:
+                # Every operation in one transaction: all of them apply or none do
+                if not isinstance(body.get("operations"), list):
+                    raise HTTPError(400, "operations must be a list")
+                return 200, {"results": await self.write(lambda dm: run_operations(dm, body["operations"]))}
+        raise HTTPError(404, f"no route for {method} {path}")
+
+    async def dispatch(self, method, target, raw_body):
+        url = urlsplit(target)
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise HTTPError(400, "body must be a JSON object")
+            return await self.route(method, url.path, dict(parse_qsl(url.query)), body)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except sqlite3.IntegrityError as e:
+            return 409, {"error": str(e)}
+        except (ValueError, TypeError) as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            log.exception("%s %s failed", method, target)
+            return 500, {"error": str(e)}
+
+    async def handle(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive; clients are local scripts, not browsers
+        try:
+            while request_line := await reader.readline():
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                length = int(headers.get("content-length", 0))
+                if length > SERVE_MAX_BODY:
+                    status, payload, keep_alive = 413, {"error": f"body is larger than {SERVE_MAX_BODY} bytes"}, False
+                else:
+                    status, payload = await self.dispatch(method, target, await reader.readexactly(length))
+                data = json.dumps(payload).encode()
+                head = f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                writer.write((head + ("" if keep_alive else "Connection: close\r\n") + "\r\n").encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=SERVE_HOST, port=SERVE_PORT, socket_path=None):
+        if socket_path:
+            # Only a stale socket from an earlier run is replaced; never delete a file the user pointed at by mistake
+            try:
+                if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                    raise FileExistsError(f"{socket_path} exists and is not a socket")
+                os.remove(socket_path)
+            except FileNotFoundError:
+                pass
+            return await asyncio.start_unix_server(self.handle, path=socket_path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        self.write_pool.shutdown()
+        self.read_pool.shutdown()
+
+
+def serve(db_path, host=SERVE_HOST, port=SERVE_PORT, socket_path=None, readers=SERVE_READERS):
+    server = Server(db_path, readers)
+
+    async def run():
+        listener = await server.start(host, port, socket_path)
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.close()
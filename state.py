@@ -8,17 +8,19 @@
 # Tracks te state of projectarium
 #
 
-import os
-
 from config import *
 from db import DatabaseManager
+from index import ProjectIndex
+from launcher import Launcher, command
+from scanner import Scanner
+from backup import Backup
 from objects import Project, TodoItem
+from dataclasses import fields
 
-from ui.layout import Window, Card, TodoList
+from ui.layout import Window, Card, TodoList, SearchBox, StatsView, place_windows
 
 import curses
-
-STATUS_NAMES = ["Abandoned", "Backlog", "Active", "Done"]
+import time
 
 
 class StateManager:
@@ -30,25 +32,102 @@ class StateManager:
         self.active_card = 0
         self.mode = COLORED
         self.in_todo = False
-        self.projects = []
+        self.search = None
+        self.in_search = False
+        self.in_reorder = False
+        self.stats = None
+        self.selected = set()
+        self.visual_anchor = None
+        self.redraw = set()
+        self.index = ProjectIndex()
+        self.windows = []
+        self.full_redraw = False
+        self.launcher = Launcher()
+        self.scanner = None
+        self.backup = None
+        self.scan_keys = {}
+        self.synced_rev = 0
+        self.data_version = None
+        self.next_archive = 0.0
+        self.profiler = None
+        self.notice = ""
 
     def init(self):
-        self.projects = self.dm.pull_projects()
-        # self.get_active_window_projects()
-
-    def get_projects(self) -> list[Card]:
-        return [Card.from_project(project) for project in self.projects]
-
-    def get_projects_by_status(self, status) -> list[Card]:
-        return [Card.from_project(project) for project in self.projects if project.status == status]
+        self.synced_rev = self.dm.current_rev()
+        self.data_version = self.dm.data_version()
+        self.index.load(self.dm.pull_projects())
+
+    def sync_external(self):
+        # Cheap check on every idle tick; only rows stamped after synced_rev are re-read
+        data_version = self.dm.data_version()
+        if data_version == self.data_version:
+            return
+        self.data_version = data_version
+        self.synced_rev, changed, deleted = self.dm.pull_changes(self.synced_rev)
+        for project in changed:
+            if existing := self.index.get(project.id):
+                changes = {field.name: getattr(project, field.name) for field in fields(project)
+                           if field.name != "scan" and getattr(existing, field.name) != getattr(project, field.name)}
+                if changes:
+                    self.index.update(project.id, **changes)
+            else:
+                self.index.add(project)
+        for project_id in deleted:
+            self.index.remove(project_id)
+        self.clamp_card()
+
+    def start_backups(self):
+        if path := self.dm.path():
+            self.backup = Backup(path)
+
+    def start_backup(self):
+        # Commit pending write-behind work first so the snapshot includes it
+        if self.backup:
+            self.dm.flush()
+            if self.backup.start():
+                self.draw_cw()
+
+    def start_scanner(self):
+        for project_id, (key, info) in self.dm.pull_scans().items():
+            self.scan_keys[project_id] = key
+            if project := self.index.get(project_id):
+                project.scan = info
+        self.scanner = Scanner()
+        self.scanner.submit(list(self.index.by_id.values()), self.scan_keys)
+
+    def apply_scans(self, results):
+        self.dm.save_scans(results)
+        for project_id, key, info in results:
+            if key is None:
+                self.scan_keys.pop(project_id, None)
+            else:
+                self.scan_keys[project_id] = key
+            if self.index.get(project_id):
+                self.index.update(project_id, scan=info)
+
+    def sync_windows(self):
+        # Windows share the index's column lists, so a touched column only needs its scroll clamped and a redraw
+        dirty = [STATUSES[status][0] for status in self.index.take_dirty()]
+        for window_id in dirty:
+            self.windows[window_id].set_projects(self.index.column(self.windows[window_id].title))
+        redraw, self.redraw = self.redraw, set()
+        if self.full_redraw:
+            self.full_redraw = False
+            return range(len(self.windows))
+        return redraw.union(dirty)
 
     def draw_cw(self): # TODO: only update active window and new active window
         # Explicit shortcut mapping
         if self.in_todo:
-            commands = [("a", "add"), ("e", "delete"), ("e", "edit"), ("q", "quit")] 
+            commands = [("a", "add"), ("e", "delete"), ("e", "edit"), ("␣", "select"), ("V", "visual"), ("M", "move"), ("q", "quit")] 
+        elif self.in_reorder:
+            commands = [("↑/↓", "move"), ("g", "top"), ("G", "bottom"), ("#", "position"), ("o", "done")]
         else:
-            commands = [("a", "add"), ("d", "delete"), ("e", "edit"), ("c", "cd"), ("n", "nvim"), ("m", "tmux"),
-                        ("b", "both"), ("t", "todo"), ("p", "progress"), ("r", "regress"), ("v", "view"), ("q", "quit")]
+            commands = [("a", "add"), ("d", "delete"), ("e", "edit"), ("␣", "select"), ("V", "visual"), ("c", "cd"), ("n", "nvim"), ("m", "tmux"),
+                        ("b", "both"), ("t", "todo"), ("p", "progress"), ("r", "regress"), ("o", "reorder"), ("v", "view"), ("/", "search"), ("S", "stats"), ("w", "backup"), ("q", "quit")]
+        for status in (self.notice, self.launcher.status, self.backup.status if self.backup else "", self.profiler.summary() if self.profiler else ""):
+            if status:
+                commands = commands + [("»", status)]
         self.cw.help(commands)
 
         # Implicit shortcut mapping example:
@@ -61,32 +140,87 @@ class StateManager:
     def get_active_card(self) -> Project:
         return self.get_active_window_projects()[self.active_card]
 
+    def fits(self) -> bool:
+        return bool(self.windows) and self.windows[0].geometry.fits
+
+    def show_notice(self, text):
+        self.notice = text
+        self.draw_cw()
+
+    def get_active_window_card(self) -> Card:
+        return self.windows[self.active_window].card_at(self.active_card)
+
+    def stage_active_card(self) -> Card:
+        # Keys in a coalesced batch run before the next draw, so card slots can still show the old order.
+        # Stage the active column now so an overlay anchors to the card that shows the active project
+        window = self.windows[self.active_window]
+        window.follow(self.active_card)
+        window.draw_cards(self.active_window, self.active_card, self.mode)
+        self.redraw.add(self.active_window)
+        return self.get_active_window_card()
+
     def get_active_window_projects(self) -> list[Project]:
-        return [project for project in self.projects if project.status == STATUS_NAMES[self.active_window]]
+        return self.index.column(STATUS_NAMES[self.active_window])
+
+    def clamp_card(self):
+        self.active_card = max(0, min(self.active_card, len(self.get_active_window_projects()) - 1))
+
+    def follow(self, project):
+        # Keep the cursor on a project after it moves within or between columns
+        if project.status not in STATUSES:
+            return
+        self.active_window = STATUSES[project.status][0]
+        self.active_card = self.index.position(project)
 
 ###########################
 ### USERSPACE FUNCTIONS ###
 ###########################
 
+    def launch(self, label, argv, quit=False):
+        self.launcher.launch(label, argv)
+        self.draw_cw()
+        if quit:
+            self.launcher.flush()
+            exit(0)
+
+    def idle(self):
+        self.dm.flush_if_idle()
+        self.sync_external()
+        if self.scanner:
+            if results := self.scanner.drain():
+                self.apply_scans(results)
+            if self.scanner.due():
+                self.scanner.submit(list(self.index.by_id.values()), self.scan_keys)
+        if self.backup and self.backup.due():
+            self.start_backup()
+        if time.time() >= self.next_archive and not self.dm.archive_step():
+            self.next_archive = time.time() + ARCHIVE_INTERVAL_SECONDS
+        if self.launcher.reap() or self.backup and self.backup.reap():
+            self.draw_cw()
+
     def open_dir(self, quit=False):
-        os.system(f"{TERMINAL_PREFIX}{self.get_active_card().path}")
-        if quit: exit(0)
+        card = self.get_active_card()
+        self.launch(f"cd {card.name}", command(TERMINAL_COMMAND, path=card.path), quit)
 
     def open_nvim(self, quit=False):
-        log.info(f"Opening Neovim for card: {self.get_active_card().name} in window {self.active_window}")
-        os.system(f"{TERMINAL_PREFIX}{self.get_active_card().path} -- bash -c \'{NEOVIM_PREFIX + self.get_active_card().file}\'") if self.get_active_card().file != "" else "",         # pyright: ignore[reportUnusedExpression]
-        if quit: exit(0)
+        card = self.get_active_card()
+        log.info("Opening Neovim for card: %s in window %d", card.name, self.active_window)
+        if card.file != "":
+            self.launch(f"nvim {card.name}", command(TERMINAL_COMMAND, path=card.path) + ["--"] + command(NEOVIM_COMMAND, file=card.file), quit)
+        elif quit:
+            # Nothing to open here, but a launch queued before (open_both's cd) must still go out
+            self.launcher.flush()
+            exit(0)
 
     def open_tmux(self, quit=False):
-        session_name = self.get_active_card().name.lower().replace(" ", "_").replace("-", "_")
-        os.system(f"{TERMINAL_PREFIX}{self.get_active_card().path} -- bash -c \'{TMUX_PREFIX} {session_name} -c {self.get_active_card().path}\' &> /dev/null")
-        if quit: exit(0)
+        card = self.get_active_card()
+        session_name = card.name.lower().replace(" ", "_").replace("-", "_")
+        self.launch(f"tmux {session_name}", command(TERMINAL_COMMAND, path=card.path) + ["--"] + command(TMUX_COMMAND, session=session_name, path=card.path), quit)
 
 
     def open_both(self, quit=False):
         self.open_dir()
-        self.open_nvim()
-        if quit: exit(0)
+        self.open_nvim(quit)
 
     def set_mode(self, new_mode):
         self.mode = new_mode
@@ -98,7 +232,15 @@ class StateManager:
 
     def open_todo(self):
         # log.info(f"Opening todo for card: {self.get_active_card().name} in window {self.active_window}")
-        self.tm = TodoList(self.active_window, self.get_active_card(), self.dm.pull_todo_data(self.get_active_card().id))
+        if not self.get_active_window_projects():
+            return
+        if not self.fits():
+            # No card windows exist to anchor the list to
+            self.show_notice("too small for todos")
+            return
+        project_id = self.get_active_card().id
+        self.tm = TodoList(self.active_window, self.stage_active_card(), project_id, lambda offset, limit: self.dm.pull_todo_page(project_id, offset, limit),
+                           self.dm.count_todo(project_id), self.dm.longest_todo(project_id))
         self.in_todo = True
         # self.cw.help(self.active_window, self.get_active_card(), self.in_todo)
         self.set_mode(DIM)
@@ -107,102 +249,334 @@ class StateManager:
 
     def quit_todo(self):
         if self.tm: self.tm.close()
-        
+
+        self.full_redraw = True
         self.in_todo = False
         self.set_mode(COLORED)
         # self.cw.help(self.active_window, self.get_active_card(), self.in_todo)
 
     def hide_todo(self):
         if self.tm: self.tm.close()
-
+        self.full_redraw = True
+
+    def todo_move(self, move):
+        # The todo list belongs to one project, so moving the cursor in todo mode reopens it on the new card
+        move()
+        if not self.tm or not self.get_active_window_projects() or self.get_active_card().id == self.tm.project_id:
+            return
+        self.hide_todo()
+        self.open_todo()
+
+
+    def resize(self):
+        # One relayout per KEY_RESIZE; drawing then only reads the new geometry
+        curses.update_lines_cols()
+        place_windows(self.windows, curses.LINES, curses.COLS)
+        self.full_redraw = True
+        self.notice = ""
+        if self.tm and self.in_todo and not self.fits():
+            self.quit_todo()
+            self.notice = "too small for todos"
+        if self.tm and self.in_todo:
+            self.tm.card = self.stage_active_card()
+            self.tm.layout(self.tm.longest)
+            self.tm.draw_todo()
+        if self.search:
+            self.search.layout()
+            self.search.draw()
+        if self.stats:
+            self.stats.layout()
+            self.stats.draw()
+        self.draw_cw()
+
+    def open_stats(self):
+        self.stats = StatsView(*self.dm.pull_stats())
+        self.stats.draw()
+
+    def quit_stats(self):
+        if self.stats: self.stats.close()
+        self.stats = None
+        self.full_redraw = True
+
+    def open_search(self):
+        self.search = SearchBox()
+        self.in_search = True
+        self.search.draw()
+
+    def quit_search(self):
+        if self.search: self.search.close()
+        self.search = None
+        self.in_search = False
+        self.full_redraw = True
+
+    def run_search(self):
+        results = []
+        for rowid, project_id, body in self.dm.search(self.search.query):
+            # Todos of deleted projects can still be indexed, so only keep hits on the board
+            if project := self.index.get(project_id):
+                results.append((project_id, body if rowid % 2 == 0 else f"{project.name}: {body}"))
+        self.search.set_results(results)
+
+    def search_key(self, key):
+        if key == "\x1b":
+            self.quit_search()
+        elif key in ("\n", "KEY_ENTER"):
+            project = self.index.get(self.search.get_selected())
+            self.quit_search()
+            if project:
+                self.follow(project)
+        elif key == "KEY_UP":
+            self.search.up()
+        elif key == "KEY_DOWN":
+            self.search.down()
+        elif key in ("KEY_BACKSPACE", "\x7f", "\b"):
+            self.search.query = self.search.query[:-1]
+            self.run_search()
+        elif len(key) == 1 and key.isprintable():
+            self.search.query += key
+            self.run_search()
 
     def up(self):
         if self.active_card > 0:
             self.active_card -= 1
+            if self.visual_anchor is not None:
+                self.redraw.add(self.active_window)
 
     def down(self):
         if self.active_card < len(self.get_active_window_projects()) - 1:
             self.active_card += 1
+            if self.visual_anchor is not None:
+                self.redraw.add(self.active_window)
 
     def right(self):
         # log.info(f"Active window: {self.active_window}, Total windows: {len(self.windows)}")
-        if self.active_window < 3:
+        if self.active_window < len(STATUS_NAMES) - 1:
+            self.end_visual()
             self.active_window += 1
+            self.clamp_card()
 
     def left(self):
         if self.active_window > 0:
+            self.end_visual()
             self.active_window -= 1
-
+            self.clamp_card()
+
+    def get_selection(self):
+        # Toggled projects plus the visual range in the active column
+        if self.visual_anchor is None:
+            return self.selected
+        column = self.get_active_window_projects()
+        first, last = sorted((self.visual_anchor, self.active_card))
+        return self.selected.union(project.id for project in column[first:last + 1])
+
+    def toggle_select(self):
+        if self.get_active_window_projects():
+            self.selected ^= {self.get_active_card().id}
+            self.redraw.add(self.active_window)
+            self.down()
+
+    def toggle_visual(self):
+        if self.visual_anchor is None and self.get_active_window_projects():
+            self.visual_anchor = self.active_card
+            self.redraw.add(self.active_window)
+        else:
+            self.end_visual()
+
+    def end_visual(self):
+        # Keep the range selected after leaving visual mode or the column
+        if self.visual_anchor is not None:
+            self.selected = self.get_selection()
+            self.visual_anchor = None
+
+    def take_selection(self) -> list[Project]:
+        # The selected projects, clearing the selection; empty when nothing is selected
+        selection = self.get_selection()
+        if not selection:
+            return []
+        self.selected, self.visual_anchor = set(), None
+        self.full_redraw = True
+        return [project for project_id in selection if (project := self.index.get(project_id))]
+
+    def escape(self):
+        if self.get_selection():
+            self.take_selection()
+        else:
+            exit(0)
+
+    def set_statuses(self, projects, step):
+        rows = [(STATUS_NAMES[i], project.id) for project in projects if 0 <= (i := STATUSES[project.status][0] + step) < len(STATUS_NAMES)]
+        self.dm.set_statuses(rows)
+        for status, project_id in rows:
+            self.index.update(project_id, status=status)
+        self.clamp_card()
+
+    def set_priorities(self, projects, step):
+        rows = [(project.priority + step, project.id) for project in projects if 0 <= project.priority + step <= 99]
+        self.dm.set_priorities(rows)
+        for priority, project_id in rows:
+            self.index.update(project_id, priority=priority)
+        self.clamp_card()
 
     def progress(self):
-        card = self.windows[self.active_window].cards[self.active_card]
-        if self.active_window >= 3: return
+        if projects := self.take_selection():
+            return self.set_statuses(projects, 1)
+        if self.active_window >= len(STATUS_NAMES) - 1: return
+        card = self.get_active_card()
         self.dm.progress(card.name, self.active_window)
-        
+        self.index.update(card.id, status=STATUS_NAMES[self.active_window + 1])
+
         self.up()
-        if len(self.get_active_window_cards()) == 0:
+        if len(self.get_active_window_projects()) == 0:
             self.right()
-        
+        self.clamp_card()
+
     def regress(self):
-        card = self.windows[self.active_window].cards[self.active_card]
+        if projects := self.take_selection():
+            return self.set_statuses(projects, -1)
         if self.active_window <= 0: return
+        card = self.get_active_card()
         self.dm.regress(card.name, self.active_window)
-        
+        self.index.update(card.id, status=STATUS_NAMES[self.active_window - 1])
+
         self.up()
-        if len(self.get_active_window_cards()) == 0:
+        if len(self.get_active_window_projects()) == 0:
             self.left()
+        self.clamp_card()
 
     def increment_priority(self):
-        card = self.windows[self.active_window].cards[self.active_card]
+        if projects := self.take_selection():
+            return self.set_priorities(projects, 1)
+        card = self.get_active_card()
         if card.priority < 99:
             self.dm.increment_priority(card.name, card.priority)
-            
+            self.follow(self.index.update(card.id, priority=card.priority + 1))
 
     def decrement_priority(self):
-        card = self.windows[self.active_window].cards[self.active_card]
+        if projects := self.take_selection():
+            return self.set_priorities(projects, -1)
+        card = self.get_active_card()
         if card.priority > 0:
             self.dm.decrement_priority(card.name, card.priority)
-            
-        
+            self.follow(self.index.update(card.id, priority=card.priority - 1))
+
+    def open_reorder(self):
+        if self.get_active_window_projects():
+            self.in_reorder = True
+            self.draw_cw()
+
+    def quit_reorder(self):
+        self.in_reorder = False
+        self.draw_cw()
+
+    def move_card(self, position):
+        # Take the priority of the card being passed and a rank between the new neighbours, so the move is one row
+        column = self.get_active_window_projects()
+        position = max(0, min(position, len(column) - 1))
+        if not column or position == self.active_card:
+            return
+        project = column[self.active_card]
+        if position < self.active_card:
+            above, below = (column[position - 1] if position > 0 else None), column[position]
+            priority = below.priority
+            rank = below.rank - RANK_STEP if above is None or above.priority != priority else (above.rank + below.rank) / 2
+        else:
+            above, below = column[position], (column[position + 1] if position + 1 < len(column) else None)
+            priority = above.priority
+            rank = above.rank + RANK_STEP if below is None or below.priority != priority else (above.rank + below.rank) / 2
+        if above and below and rank in (above.rank, below.rank):
+            self.index.rerank(project.status, self.dm.rebalance(project.status))
+            return self.move_card(position)
+        self.dm.move_project(project.id, priority, rank)
+        self.follow(self.index.update(project.id, priority=priority, rank=rank))
+
+    def move_up(self):
+        self.move_card(self.active_card - 1)
+
+    def move_down(self):
+        self.move_card(self.active_card + 1)
+
+    def move_top(self):
+        self.move_card(0)
+
+    def move_bottom(self):
+        self.move_card(len(self.get_active_window_projects()) - 1)
+
+    def move_to(self):
+        position = self.cw.get_input("Position", default=str(self.active_card + 1))
+        if position and position.isdigit():
+            self.move_card(int(position) - 1)
+
+    def update_todo(self, todo_count):
+        self.tm.update_tm(todo_count, self.dm.longest_todo(self.tm.project_id))
+        self.index.update(self.tm.project_id, todo_count=todo_count)
+
     def add_item(self):
         if self.tm:
-            self.tm.update_tm(self.dm.add_item(self.cw.get_input("New todo item", required=True), self.get_active_card().id))
-            
+            self.update_todo(self.dm.add_item(self.cw.get_input("New todo item", required=True), self.tm.project_id))
+
             self.tm.draw_todo()
 
     def edit_item(self):
-        if self.tm and self.get_active_card().todo_count > 0:
-            new_description = self.cw.get_input("Description", default=self.tm.todo_list[self.tm.selected_item][1], required=True)
-            todo_id = self.tm.todo_list[self.tm.selected_item][0]
-            self.tm.update_tm(self.dm.edit_item(todo_id, new_description, self.get_active_card().id))
-            
+        if self.tm and self.tm.count > 0:
+            new_description = self.cw.get_input("Description", default=self.tm.get_selected().description, required=True)
+            todo_id = self.tm.get_selected().id
+            self.update_todo(self.dm.edit_item(todo_id, new_description, self.tm.project_id))
+
             self.tm.draw_todo()
 
     def delete_item(self):
-        if self.tm and self.get_active_card().todo_count > 0:
-            self.tm.update_tm(self.dm.delete_item(self.tm.todo_list[self.tm.selected_item][0], self.get_active_card().id))
-            
+        if self.tm and self.tm.count > 0:
+            if item_ids := self.tm.take_selection():
+                self.update_todo(self.dm.delete_items(item_ids, self.tm.project_id))
+            else:
+                self.update_todo(self.dm.delete_item(self.tm.get_selected().id, self.tm.project_id))
+
             self.tm.draw_todo()
 
+    def move_items(self):
+        # Moves the selected todos (or the highlighted one) to another project by name
+        if not self.tm or self.tm.count == 0:
+            return
+        name = self.cw.get_input("Move to project", required=True)
+        target = next((project for project in self.index.by_id.values() if project.name.lower() == (name or "").lower()), None)
+        if not target or target.id == self.tm.project_id:
+            return
+        item_ids = self.tm.take_selection() or [self.tm.get_selected().id]
+        source_count, target_count = self.dm.move_items(item_ids, self.tm.project_id, target.id)
+        self.index.update(target.id, todo_count=target_count)
+        self.update_todo(source_count)
+        self.tm.draw_todo()
+
     def add_project(self):
         name = self.cw.get_input("Name", required=True)
         description = self.cw.get_input("Description")
         path = self.cw.get_input("Path", input_type="path", required=True)
         file = self.cw.get_input("File", input_type="path")
         language = self.cw.get_input("Language")
-        self.dm.add_project(name, description, path, file, "Backlog", language)
-        
+        project_id = self.dm.add_project(name, description, path, file, NEW_PROJECT_STATUS, language)
+        self.index.add(self.dm.pull_project(project_id))
+
 
     def edit_project(self):
         if field := self.cw.make_selection("Attribute", EDIT_PROJECT_CHOICES):
             new_val = self.cw.get_input(field, default=self.dm.get_card_data(field, self.get_active_card().id)[0])
             self.dm.edit_project(field, new_val, self.get_active_card().id)
-        
+            self.follow(self.index.update(self.get_active_card().id, **{field: new_val}))
+
 
     def delete_project(self):
+        if selection := self.get_selection():
+            if self.cw.make_selection(f"Delete {len(selection)} projects?", ["Yes", "No"], default="No", required=True) == "Yes":
+                self.dm.delete_projects([project.id for project in self.take_selection()])
+                for project_id in selection:
+                    self.index.remove(project_id)
+                self.clamp_card()
+            return
         if self.cw.make_selection("Delete?", ["Yes", "No"], default="No", required=True) == "Yes":
             self.dm.delete_project(self.get_active_card().id)
+            self.index.remove(self.get_active_card().id)
             self.up()
-        
+            self.clamp_card()
+
 
 
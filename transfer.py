@@ -0,0 +1,81 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: transfer.py
+#
+
+#
+# Streaming JSON Lines / CSV import and export for projectarium
+#
+
+import csv
+import json
+
+from config import *
+
+PROJECT_FIELDS = ["name", "description", "path", "file", "priority", "status", "language"]
+TODO_FIELDS = ["project", "description", "priority"]
+
+
+def write_rows(rows, fields, out, fmt):
+    # rows is a cursor, so only one row is in memory at a time
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(fields)
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            out.write(json.dumps(dict(zip(fields, row))) + "\n")
+
+def read_records(inp, fmt):
+    if fmt == "csv":
+        yield from enumerate(csv.DictReader(inp), start=2)
+    else:
+        for line_number, line in enumerate(inp, start=1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"line {line_number}: {e}")
+                if not isinstance(record, dict):
+                    raise ValueError(f"line {line_number}: expected a JSON object, got {type(record).__name__}")
+                yield line_number, record
+
+def priority(record, line_number):
+    try:
+        return int(record.get("priority") or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"line {line_number}: priority must be an integer, got {record.get('priority')!r}")
+
+
+def project_rows(records):
+    for line_number, record in records:
+        if not record.get("name") or not record.get("path"):
+            raise ValueError(f"line {line_number}: name and path are required")
+        status = record.get("status") or NEW_PROJECT_STATUS
+        if status not in STATUSES:
+            raise ValueError(f"line {line_number}: unknown status {status!r}")
+        description = record.get("description") or ""
+        if len(description) > 29:
+            raise ValueError(f"line {line_number}: description is longer than 29 characters")
+        yield (record["name"], description, record["path"], record.get("file") or "",
+               priority(record, line_number), status, record.get("language") or "")
+
+def todo_rows(records):
+    for line_number, record in records:
+        if not record.get("project") or not record.get("description"):
+            raise ValueError(f"line {line_number}: project and description are required")
+        yield (record["description"], priority(record, line_number), record["project"])
+
+
+def export_data(dm, out, fmt="jsonl", todos=False):
+    if todos:
+        write_rows(dm.export_todos(), TODO_FIELDS, out, fmt)
+    else:
+        write_rows(dm.export_projects(), PROJECT_FIELDS, out, fmt)
+
+def import_data(dm, inp, fmt="jsonl", todos=False):
+    records = read_records(inp, fmt)
+    if todos:
+        return dm.import_todos(todo_rows(records))
+    return dm.import_projects(project_rows(records))
@@ -11,211 +11,456 @@
 from config import *
 
 import curses
+import time
 
 def draw_box(window, attributes):
     window.attron(attributes)
     window.box()
     window.attroff(attributes)
 
+def format_age(timestamp):
+    return format_duration(time.time() - timestamp)
+
+def format_duration(seconds):
+    seconds = max(seconds, 0)
+    for unit, size in (("w", 604800), ("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit}"
+    return "now"
+
+class Geometry:
+    # Every column and card coordinate for one screen size, computed at startup and on KEY_RESIZE only
+    def __init__(self, screen_height, screen_width, columns=len(STATUSES)):
+        self.screen_height, self.screen_width = screen_height, screen_width
+        self.h = screen_height - COMMAND_WINDOW_HEIGHT
+        self.w = (screen_width - ((columns - 1) * X_PAD)) // columns # no right-hand padding
+        self.card_w = self.w - 2*X_PAD
+        self.columns = [(0, i * (self.w + X_PAD)) for i in range(columns)]
+        self.fits = self.card_w >= MIN_CARD_WIDTH and self.h >= ACTIVE_CARD_HEIGHT + Y_PAD + 1
+
+    def column(self, i):
+        # y, x of column i and of its cards
+        y, x = self.columns[i]
+        return y, x, x + X_PAD
+
+def build_windows(screen_height, screen_width):
+    geometry = Geometry(screen_height, screen_width)
+    return [Window(i, geometry, title, color=color) for i, (title, (_, color)) in enumerate(STATUSES.items())]
+
+def place_windows(windows, screen_height, screen_width):
+    geometry = Geometry(screen_height, screen_width, len(windows))
+    for window in windows:
+        window.place(geometry)
+    return geometry
+
 class Window:
-    def __init__(self, id, win, title, color=WHITE):
+    def __init__(self, id, geometry, title, color=WHITE):
         self.id = id
-        self.win = win
         self.title = title
         self.color = color
+        # The index's own column list, in board order; only the visible slots get a Card
+        self.projects = []
         self.cards = []
         self.card_offset = 0
-
-        self.h, self.w = self.win.getmaxyx()
-        self.y = 0
-        self.x = STATUSES[self.title][0] * self.w
+        self.scroll = 0
+        self.win = curses.newwin(1, 1, 0, 0)
+        # One reusable card window per slot that can be on screen at once
+        self.pool = []
+        self.place(geometry)
+
+    def place(self, geometry):
+        self.geometry = geometry
+        self.h, self.w = geometry.h, geometry.w
+        self.y, self.x, self.card_x = geometry.column(self.id)
+        self.card_w = geometry.card_w
+        if not geometry.fits:
+            return
+        # Resize before moving, so the window never hangs off the new screen edge
+        self.win.resize(self.h, self.w)
+        self.win.mvwin(self.y, self.x)
+        capacity = self.capacity()
+        self.pool = self.pool[:capacity] + [curses.newwin(INACTIVE_CARD_HEIGHT, self.card_w, 0, 0) for _ in range(capacity - len(self.pool))]
+        for win in self.pool:
+            win.resize(INACTIVE_CARD_HEIGHT, self.card_w)
+        self.cards = self.cards[:capacity] + [Card(None) for _ in range(capacity - len(self.cards))]
+        for card, win in zip(self.cards, self.pool):
+            card.attach(win)
 
     def __str__(self):
-        return f"Window(id={self.id}, title='{self.title}', color={self.color}, cards={len(self.cards)})"
+        return f"Window(id={self.id}, title='{self.title}', color={self.color}, cards={len(self.projects)})"
 
     def has_cards(self):
-        return len(self.cards) > 0
-
-    def add_card(self, project):
-        new_y = self.y + Y_PAD + self.card_offset
-        new_x = self.x + (X_PAD * self.id) + X_PAD
-        card = Card.new_card(project, new_y, new_x, INACTIVE_CARD_HEIGHT, self.w - (2 * X_PAD))
-        log.info(f"Adding card {card} to window {self.id} at position ({new_y}, {new_x})")
-        self.cards.append(card)
-        self.card_offset += INACTIVE_CARD_HEIGHT
-
-    def draw_window(self, active_window_id, active_card_id, mode=0):
+        return len(self.projects) > 0
+
+    def capacity(self):
+        return max(self.card_space() // INACTIVE_CARD_HEIGHT, 1)
+
+    def card_space(self):
+        return self.h - Y_PAD - 1
+
+    def set_projects(self, projects):
+        # O(1): the list is shared with the index, and cards are bound to projects only when drawn
+        self.projects = projects
+        self.scroll = max(0, min(self.scroll, len(self.projects) - 1))
+
+    def card_at(self, i):
+        # The pooled card showing project i; only valid for a visible i after draw_cards
+        return self.cards[i - self.scroll]
+
+    def viewport(self, active_card_id=None):
+        # Last card index that fits below self.scroll; the active card is taller than the rest
+        offset, last = 0, self.scroll - 1
+        for i in range(self.scroll, len(self.projects)):
+            offset += ACTIVE_CARD_HEIGHT if i == active_card_id else INACTIVE_CARD_HEIGHT
+            if offset > self.card_space(): break
+            last = i
+        return self.scroll, last
+
+    def follow(self, active_card_id):
+        scroll = self.scroll
+        above = max((self.card_space() - ACTIVE_CARD_HEIGHT) // INACTIVE_CARD_HEIGHT, 0)
+        if active_card_id < self.scroll:
+            self.scroll = active_card_id
+        elif active_card_id - self.scroll > above:
+            self.scroll = active_card_id - above
+        return scroll != self.scroll
+
+    def draw_window(self, active_window_id, active_card_id, mode=0, selected=()):
+        if not self.geometry.fits:
+            return
+        self.win.erase()
         style = self.color | BOLD if active_window_id == self.id else self.color
         draw_box(self.win, (style if mode != DIM else DARK_GREY))
-        self.win.addstr(0, X_PAD, f" {self.title} ({str(len(self.cards))}) ", (WHITE | BOLD if active_window_id == self.id else style))
-        self.win.refresh()
-
-        log.info(f"Length of cards in window {self.id}: {len(self.cards)}, cards: {[str(card) for card in self.cards]}")
-        self.card_offset = 0
-        for i, card in enumerate(self.cards):
-            active = (self.id == active_window_id and i == active_card_id)
-            log.info(f"Drawing card {card} at offset {self.card_offset} in window {self.id}, active: {active}")
-            card.win.mvwin(self.y + self.card_offset + Y_PAD, self.x + X_PAD + (self.id * X_PAD))
-            card.win.resize(ACTIVE_CARD_HEIGHT, self.w - 2*X_PAD)
-            card.draw_card(mode, active)
+        self.win.addstr(0, X_PAD, f" {self.title} ({str(len(self.projects))}) ", (WHITE | BOLD if active_window_id == self.id else style))
+
+        first, last = self.viewport(active_card_id if active_window_id == self.id else None)
+        if first > 0:
+            self.win.addstr(0, self.w - X_PAD - 3, " ↑ ", style)
+        if last < len(self.projects) - 1:
+            self.win.addstr(self.h - 1, self.w - X_PAD - 3, " ↓ ", style)
+        self.win.noutrefresh()
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Projects in window %d: %s", self.id, [project.name for project in self.projects])
+        self.draw_cards(active_window_id, active_card_id, mode, selected=selected)
+
+    def draw_cards(self, active_window_id, active_card_id, mode=0, first=0, last=None, selected=()):
+        # Stages visible cards in first..last; cards scrolled past are skipped, and cards before first
+        # are inactive unless the active card is in range
+        if not self.geometry.fits:
+            return
+        active_card_id = active_card_id if active_window_id == self.id else None
+        top, bottom = self.viewport(active_card_id)
+        first = max(first, top)
+        last = bottom if last is None else min(last, bottom)
+        self.card_offset = (first - top) * INACTIVE_CARD_HEIGHT
+        for i in range(first, last + 1):
+            card = self.cards[i - top]
+            card.project = self.projects[i]
+            active = i == active_card_id
+            log.debug("Drawing card %s at offset %d in window %d, active: %s", card, self.card_offset, self.id, active)
+            card.win.resize(INACTIVE_CARD_HEIGHT, self.card_w)
+            card.win.mvwin(self.y + self.card_offset + Y_PAD, self.card_x)
+            card.draw_card(mode, active, card.project.id in selected)
             self.card_offset += ACTIVE_CARD_HEIGHT if active else INACTIVE_CARD_HEIGHT
 
 
 class Card():
-    def __init__(self, id, win, name, path, description="", file="", priority=0, status="", language="", todo_count=0):
-        self.id = id
-        self.win = win
-        self.h, self.w = win.getmaxyx()
-        self.y, self.x = win.getbegyx()
-        self.name = name
-        self.path = path
-        self.file = file
-        self.priority = priority
-        self.description = description
-        self.status = status
-        self.language = language
-        self.todo_count = todo_count
+    # A card only draws its Project; the index owns the data, so edits show up without copying
+    __slots__ = ("project", "win", "h", "w", "y", "x", "active", "text_color")
+
+    def __init__(self, project, win=None):
+        self.project = project
+        self.win = None
         self.active = False
         self.text_color = WHITE
+        if win:
+            self.attach(win)
 
     def __str__(self):
-        return f"Card(id={self.id}, name='{self.name}', status={self.status})"
+        return f"Card(id={self.project.id}, name='{self.project.name}', status={self.project.status})"
 
-    @classmethod
-    def from_project(cls, project):
-        return cls(
-            project.id,
-            curses.newwin(INACTIVE_CARD_HEIGHT, 0, 0, 0),  # Placeholder for win, will be given later
-            project.name,
-            project.path,
-            project.description,
-            project.file,
-            project.priority,
-            project.status,
-            project.language,
-            project.todo_count
-        )
+    @property
+    def id(self):
+        return self.project.id
 
     @classmethod
     def new_card(cls, project, y, x, h, w):
-        return cls(
-            project.id,
-            curses.newwin(h, w, y, x),
-            project.name,
-            project.path,
-            project.description,
-            project.file,
-            project.priority,
-            project.status,
-            project.language,
-            project.todo_count
-        )
+        return cls(project, curses.newwin(h, w, y, x))
+
+    def attach(self, win):
+        self.win = win
+        self.h, self.w = win.getmaxyx()
+        self.y, self.x = win.getbegyx()
 
     def clear(self):
         self.win.erase()
 
-    def draw_card(self, mode, active=False):
+    def draw_card(self, mode, active=False, selected=False):
+        project = self.project
+        self.win.erase()
         # self.activate()
         # self.y += y_offset
         # self.win = curses.newwin(height, width - 2 * X_PAD, self.y, self.x + X_PAD + x_offset)
 
-        self.win.addstr(Y_PAD, X_PAD, self.name, self.text_color | BOLD)
+        self.win.addstr(Y_PAD, X_PAD, project.name, self.text_color | BOLD | (INVERT if selected else 0))
         # self.win.addstr(Y_PAD, self.w - len(self.language) - X_PAD, self.language, self.text_color)
 
-        dark = DARK_GREY if mode == BLAND else color_code(self.todo_count, DARK) 
-        regular = WHITE if mode == BLAND or active and self.todo_count == 0 else color_code(self.todo_count, DARK) 
+        dark = DARK_GREY if mode == BLAND else color_code(project.todo_count, DARK) 
+        regular = WHITE if mode == BLAND or active and project.todo_count == 0 else color_code(project.todo_count, DARK) 
 
         if active:
             self.win.resize(ACTIVE_CARD_HEIGHT, self.w)
             draw_box(self.win, regular)
             self.draw_name_border(regular)
-            self.win.addstr(3, (self.w // 2) - (len(self.description) // 2), f"{self.description}", WHITE)  # description
-            self.win.addstr(4, self.w - len("items: ") - 2 - len(str(self.todo_count)), "items: ")            # 'items: '
-            self.win.addstr(4, self.w - len("items: ") - 2 - len(str(self.todo_count)), "items: ")            # 'items: '
+            self.win.addstr(3, (self.w // 2) - (len(project.description) // 2), f"{project.description}", WHITE)  # description
+            self.win.addstr(4, self.w - len("items: ") - 2 - len(str(project.todo_count)), "items: ")            # 'items: '
+            self.win.addstr(4, self.w - len("items: ") - 2 - len(str(project.todo_count)), "items: ")            # 'items: '
             self.win.addstr(4, 2, "priority: ")
-            self.win.addstr(4, len("priority: ") + 2, f"{self.priority}")
-            self.win.addstr(4, self.w - len(str(self.todo_count)) - 2, f"{self.todo_count}", color_code(self.todo_count, REGULAR))   # todo count
+            self.win.addstr(4, len("priority: ") + 2, f"{project.priority}")
+            self.win.addstr(4, self.w - len(str(project.todo_count)) - 2, f"{project.todo_count}", color_code(project.todo_count, REGULAR))   # todo count
+            if project.scan:
+                self.draw_scan()
         else:
             self.win.resize(INACTIVE_CARD_HEIGHT, self.w)
             draw_box(self.win, dark)
 
-        self.win.refresh()
+        self.win.noutrefresh()
+
+    def draw_scan(self):
+        # git branch (* when dirty), time since last change and file count, right of the name
+        scan = self.project.scan
+        branch = f"{scan.branch}{'*' if scan.dirty else ''} " if scan.branch else ""
+        label = f"{branch}{format_age(scan.last_modified)} {scan.file_count}f"
+        x = self.w - len(label) - X_PAD
+        if x > len(self.project.name) + X_PAD + 4:
+            self.win.addstr(Y_PAD, x, label, (YELLOW if scan.dirty else DIM_WHITE))
 
     def draw_name_border(self, attributes):
         if self.active:
             self.win.attron(attributes)
             self.win.addch(2, 0, '├')
-            self.win.addch(0, len(self.name) + 3, '┬')
-            self.win.addch(1, len(self.name) + 3, '│')
-            self.win.addch(2, len(self.name) + 3, '┘')
-            self.win.addstr(2, 1, '─' * (len(self.name) + 2))
+            self.win.addch(0, len(self.project.name) + 3, '┬')
+            self.win.addch(1, len(self.project.name) + 3, '│')
+            self.win.addch(2, len(self.project.name) + 3, '┘')
+            self.win.addstr(2, 1, '─' * (len(self.project.name) + 2))
             self.win.attroff(attributes)
 
 
 class TodoList():
-    def __init__(self, active_window, card, todo_list):
+    def __init__(self, active_window, card, project_id, fetch, count, longest):
+        # fetch(offset, limit) returns a page of live todo rows; longest is the widest description
         self.active_window = active_window
         self.card = card
-        self.todo_list = todo_list
+        # Every todo change goes to this project, even if the board cursor has moved since
+        self.project_id = project_id
+        self.fetch = fetch
+        self.count = count
 
         self.win = None
         self.selected_item = 0
-
+        self.scroll = 0
+        self.page = []
+        self.page_offset = 0
+        # Multi-select: toggled todo ids, plus the rows between anchor and the cursor in visual mode
+        self.marked = set()
+        self.anchor = None
+
+        self.layout(longest)
         self.draw_todo()
 
     def init(self):
         pass
 
-    def draw_todo(self):
-        if self.win:
-            self.win.erase()
-            self.win.refresh()
-
-        longest = max([len(item[1]) for item in self.todo_list]) if len(self.todo_list) > 0 else 20
-        # log.info(f"Longest todo item length: {longest}")
-        self.h = self.card.todo_count + (4 * Y_PAD) + 1
-        self.w = longest + (4 * X_PAD) + 2
+    def layout(self, longest):
+        # Geometry is computed once per open, item change or resize, never per keypress
+        self.longest = longest
+        self.rows = max(min(self.count, TODO_MAX_ROWS, curses.LINES - (4 * Y_PAD) - 1), 1)
+        self.h = self.rows + (4 * Y_PAD) + 1
+        self.w = min(max(longest, 20) + (4 * X_PAD) + 2, curses.COLS)
         self.y, self.x = self.card.win.getbegyx()
-        if self.active_window < 2:
+        # Columns in the left half open their list to the right of the card
+        if self.active_window < len(STATUSES) // 2:
             self.x += self.card.win.getmaxyx()[1] + 1 + X_PAD
         else:
-            self.x -= longest
-            self.x -= (4 * X_PAD) + 2
-            self.x -= 3
-        # self.x = (self.card.x + 10 - 1) if self.active_window < 2 else max(self.card.x - longest - (4 * X_PAD) - 2 - 3, 0)
-        # log.info(f"TodoList initialized with card at ({self.card.x}, {self.card.y}) and active window {self.active_window}.")
-        # log.info(f"Drawing todo list at ({self.x}, {self.y}) with size ({self.w}, {self.h})")
+            self.x -= self.w + 3
+        self.y = max(min(self.y, curses.LINES - self.h), 0)
+        self.x = max(min(self.x, curses.COLS - self.w), 0)
+        if self.win:
+            self.win.erase()
+            self.win.refresh()
         self.win = curses.newwin(self.h, self.w, self.y, self.x)
 
+    def get_item(self, i):
+        if not self.page_offset <= i < self.page_offset + len(self.page):
+            self.page_offset = i - i % TODO_PAGE_SIZE
+            self.page = self.fetch(self.page_offset, TODO_PAGE_SIZE)
+        return self.page[i - self.page_offset]
+
+    def get_selected(self):
+        return self.get_item(self.selected_item) if self.count > 0 else None
+
+    def draw_todo(self):
+        self.win.erase()
         draw_box(self.win, PURPLE)
         self.win.addstr(1, 2, "TODO:", WHITE | BOLD)
         self.win.addstr(2, 2, "-----", WHITE | BOLD)
-        self.items = ["• " + item[1] for item in self.todo_list if item[3] == 0]
-        item_y =  3
-        for i, item in enumerate(self.items):
-            self.win.addstr(item_y, 4, item, INVERT if i == self.selected_item else WHITE)
-            item_y += 1
-        
+        if self.scroll > 0:
+            self.win.addstr(0, self.w - X_PAD - 3, " ↑ ", PURPLE)
+        if self.scroll + self.rows < self.count:
+            self.win.addstr(self.h - 1, self.w - X_PAD - 3, " ↓ ", PURPLE)
+        for i in range(self.scroll, min(self.scroll + self.rows, self.count)):
+            self.draw_line(i)
         self.win.refresh()
 
+    def draw_line(self, i):
+        item = self.get_item(i)
+        in_range = self.anchor is not None and min(self.anchor, self.selected_item) <= i <= max(self.anchor, self.selected_item)
+        text = (("✓ " if in_range or item.id in self.marked else "• ") + item.description)[:self.w - 6]
+        self.win.addstr(3 + i - self.scroll, 4, text.ljust(self.w - 6), INVERT if i == self.selected_item else WHITE)
+
     def close(self):
         if self.win:
             self.win.erase()
-            self.items = []
+            self.page = []
             self.win.refresh()
-        
-    def down(self):
-        self.selected_item = min(self.selected_item + 1, self.card.todo_count - 1)
+
+    def select(self, i):
+        previous, self.selected_item = self.selected_item, max(min(i, self.count - 1), 0)
+        if self.selected_item < self.scroll:
+            self.scroll = self.selected_item
+        elif self.selected_item >= self.scroll + self.rows:
+            self.scroll = self.selected_item - self.rows + 1
+        elif self.anchor is None:
+            # Still in view, so only the old and new selection lines change
+            if previous != self.selected_item and self.count > 0:
+                self.draw_line(previous)
+                self.draw_line(self.selected_item)
+                self.win.refresh()
+            return
         self.draw_todo()
-            
+
+    def down(self):
+        self.select(self.selected_item + 1)
+
     def up(self):
-        self.selected_item = max(self.selected_item - 1, 0)
+        self.select(self.selected_item - 1)
+
+    def selection(self):
+        if self.anchor is None:
+            return self.marked
+        first, last = sorted((self.anchor, self.selected_item))
+        return self.marked.union(self.get_item(i).id for i in range(first, min(last, self.count - 1) + 1))
+
+    def toggle(self):
+        if self.count > 0:
+            self.marked ^= {self.get_selected().id}
+            self.draw_line(self.selected_item)
+            self.down()
+            self.win.refresh()
+
+    def toggle_visual(self):
+        if self.anchor is None and self.count > 0:
+            self.anchor = self.selected_item
+        else:
+            self.marked, self.anchor = self.selection(), None
         self.draw_todo()
 
-    def update_tm(self, new_list):
-        self.todo_list = new_list
-        self.card.todo_count = len(new_list)
-        if self.selected_item >= self.card.todo_count:
-            self.up()
+    def take_selection(self):
+        # Selected todo ids, clearing the selection
+        selection = list(self.selection())
+        self.marked, self.anchor = set(), None
+        return selection
+
+    def update_tm(self, count, longest):
+        self.count = count
+        self.page = []
+        self.selected_item = max(min(self.selected_item, count - 1), 0)
+        self.layout(longest)
+        self.scroll = min(self.scroll, max(count - self.rows, 0), self.selected_item)
+        self.scroll = max(self.scroll, self.selected_item - self.rows + 1)
+
+
+class SearchBox():
+    def __init__(self, width=SEARCH_WIDTH):
+        self.query = ""
+        self.results = []
+        self.selected = 0
+        self.width = width
+        self.win = None
+        self.layout()
 
+    def layout(self):
+        self.h = min(SEARCH_LIMIT + 4, curses.LINES)
+        self.w = min(self.width, curses.COLS - 2)
+        if self.win:
+            self.win.erase()
+            self.win.refresh()
+        self.win = curses.newwin(self.h, self.w, max((curses.LINES - self.h) // 2, 0), (curses.COLS - self.w) // 2)
+
+    def set_results(self, results):
+        # results are (project_id, label) pairs
+        self.results = results
+        self.selected = 0
+        self.draw()
 
+    def draw(self):
+        self.win.erase()
+        draw_box(self.win, PURPLE)
+        self.win.addstr(1, X_PAD, f"/{self.query}"[-(self.w - 2 * X_PAD):], WHITE | BOLD)
+        for i, (_, label) in enumerate(self.results[:self.h - 4]):
+            self.win.addstr(i + 3, X_PAD, label[:self.w - 2 * X_PAD], INVERT if i == self.selected else WHITE)
+        self.win.refresh()
+
+    def get_selected(self):
+        return self.results[self.selected][0] if self.results else None
+
+    def close(self):
+        self.win.erase()
+        self.win.refresh()
+
+    def down(self):
+        self.selected = min(self.selected + 1, max(len(self.results) - 1, 0))
+        self.draw()
+
+    def up(self):
+        self.selected = max(self.selected - 1, 0)
+        self.draw()
+
+
+class StatsView():
+    def __init__(self, dwell, occupancy, flow):
+        # Flow metrics from DatabaseManager.pull_stats, shown until the next key
+        self.lines = [("Column", "now", "avg age", "avg stay")]
+        for status in STATUSES:
+            count, age = occupancy.get(status, (0, 0))
+            self.lines.append((status, str(count), format_duration(age) if count else "-",
+                               format_duration(dwell[status]) if status in dwell else "-"))
+        self.lines.append(None)
+        self.lines.append(("Week", "done", "cycle", ""))
+        for week, finished, cycle_count, cycle_seconds in flow:
+            self.lines.append((week, str(finished), format_duration(cycle_seconds / cycle_count) if cycle_count else "-", ""))
+        self.win = None
+        self.layout()
+
+    def layout(self):
+        self.h = min(len(self.lines) + 4, curses.LINES)
+        self.w = min(4 * 12 + 2 * X_PAD + 2, curses.COLS)
+        if self.win:
+            self.win.erase()
+            self.win.refresh()
+        self.win = curses.newwin(self.h, self.w, max((curses.LINES - self.h) // 2, 0), max((curses.COLS - self.w) // 2, 0))
+
+    def draw(self):
+        self.win.erase()
+        draw_box(self.win, PURPLE)
+        self.win.addstr(1, X_PAD, "Flow", WHITE | BOLD)
+        for i, line in enumerate(self.lines[:self.h - 4]):
+            if line:
+                text = "".join(cell.ljust(12) for cell in line)[:self.w - 2 * X_PAD]
+                self.win.addstr(i + 3, X_PAD, text, WHITE | BOLD if i == 0 or line[0] == "Week" else WHITE)
+        self.win.refresh()
+
+    def close(self):
+        self.win.erase()
+        self.win.refresh()
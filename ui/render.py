@@ -0,0 +1,65 @@
+#
+# Author: Sean O'Beirne
+# Date: 10-17-2026
+# File: render.py
+#
+
+#
+# Dirty-region rendering for the TUI Kanban board
+#
+
+from config import *
+
+import curses
+
+
+class Renderer:
+    def __init__(self, windows):
+        self.windows = windows
+        self.dirty = set(range(len(windows)))
+        self.last = None
+        self.profiler = None
+
+    def invalidate(self, window_ids=None):
+        self.dirty.update(range(len(self.windows)) if window_ids is None else window_ids)
+
+    def draw(self, sm):
+        self.invalidate(sm.sync_windows())
+        if self.profiler:
+            self.profiler.lap("state")
+        overlay = sm.tm.win if sm.in_todo and sm.tm else sm.search.win if sm.in_search and sm.search else sm.stats.win if sm.stats else None
+        self.frame(sm.active_window, sm.active_card, overlay=overlay, selected=sm.get_selection())
+        if self.profiler:
+            self.profiler.lap("refresh")
+
+    def frame(self, active_window, active_card, mode=0, overlay=None, selected=()):
+        if self.last is None or self.last[2] != mode:
+            self.invalidate()
+        elif self.last[0] != active_window:
+            # Both columns change height layout when the active card leaves/enters them
+            self.invalidate((self.last[0], active_window))
+
+        if self.windows[active_window].follow(active_card):
+            self.invalidate((active_window,))
+
+        staged = bool(self.dirty)
+        for i in sorted(self.dirty):
+            self.windows[i].draw_window(active_window, active_card, mode, selected)
+
+        if self.last and self.last[0] == active_window and self.last[1] != active_card and active_window not in self.dirty:
+            # Only the cards between the old and new cursor moved or changed size
+            first, last = sorted((self.last[1], active_card))
+            self.windows[active_window].draw_cards(active_window, active_card, mode, first, last, selected)
+            staged = True
+
+        self.dirty = set()
+        self.last = (active_window, active_card, mode)
+
+        if overlay and staged:
+            overlay.touchwin()
+            overlay.noutrefresh()
+
+        if self.profiler:
+            self.profiler.lap("draw")
+        if staged:
+            curses.doupdate()